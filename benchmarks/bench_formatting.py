@@ -0,0 +1,61 @@
+"""Micro-benchmark of the week message builders.
+
+Compares formatting.week_shows with the repeated string concatenation it
+replaced, on the week-info fixture scaled to thousands of shows.
+
+    PYTHONPATH=src python benchmarks/bench_formatting.py
+"""
+
+import calendar
+import json
+import timeit
+
+from fixtures import fixture, scaled
+
+from formatting import week_shows
+from schedule import WeekSchedule
+
+
+def concatenated_week(days):
+    """The previous Week._parse_response, building the message with +="""
+    msg = ""
+    days_of_the_week = []
+    for day_number in range(0, 7):
+        days_of_the_week.append(calendar.day_name[day_number].lower())
+
+    for day in days:
+        if day not in days_of_the_week:
+            continue
+        shows = ""
+        for show in days[day]:
+            shows += "(%s - %s) - *%s*\n" % (
+                show.starts.strftime("%H:%M"),
+                show.ends.strftime("%H:%M"),
+                show.name,
+            )
+        if shows:
+            msg += "*Shows for %s*\n" % (day.capitalize(),) + shows
+    if msg:
+        msg += "_ All shows are in 🇩🇪 time!_"
+    return msg
+
+
+def main():
+    response = json.loads(fixture("response_week_info"))
+    print("%8s %12s %12s %8s" % ("shows", "+= (ms)", "join (ms)", "speedup"))
+    for factor in (1, 10, 100, 1000):
+        days = WeekSchedule(scaled(response, factor)).days
+        shows = sum(len(days[day]) for day in days)
+        assert concatenated_week(days) == week_shows(days)
+
+        number = max(1, 200 // factor)
+        before = min(timeit.repeat(lambda: concatenated_week(days), number=number))
+        after = min(timeit.repeat(lambda: week_shows(days), number=number))
+        print(
+            "%8d %12.3f %12.3f %7.2fx"
+            % (shows, before / number * 1000, after / number * 1000, before / after)
+        )
+
+
+if __name__ == "__main__":
+    main()
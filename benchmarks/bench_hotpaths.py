@@ -0,0 +1,191 @@
+"""Benchmarks of the parse and format hot paths, checked against baselines.
+
+Times the week-info and live-info paths of the commands on the fixtures of
+tests/conftest.py, and on the week-info scaled to 10x and 100x shows. Every
+time is divided by the time of a reference loop, so the baselines stored in
+baselines.json can be compared across machines. Exits with 1 when a benchmark
+is slower than its baseline by more than the threshold. The baselines are the
+median of several runs, so a noisy one doesn't end up stored.
+
+    PYTHONPATH=src python benchmarks/bench_hotpaths.py
+    PYTHONPATH=src python benchmarks/bench_hotpaths.py --update --runs 5
+"""
+
+import argparse
+import dataclasses
+import json
+import pathlib
+import sys
+import timeit
+
+from fixtures import StaticHTTPClient, fixture, scaled
+
+from commands import Now, Today, Week
+from config import KEITHFEM_BASE_URL
+from models import Show, now
+from schedule import WeekInfo, WeekSchedule
+
+BASELINES = pathlib.Path(__file__).resolve().parent / "baselines.json"
+FACTORS = (1, 10, 100)
+# Measures again a benchmark slower than its baseline, before failing, to rule
+# out a busy machine.
+RETRIES = 4
+
+
+def send(update, context, msg=None):
+    """Command.send without telegram"""
+    return msg
+
+
+def reference():
+    """A fixed amount of pure python work the benchmarks are measured in"""
+    total = 0
+    for i in range(10000):
+        total += i % 7
+    return total
+
+
+def week_parse(text):
+    week = Week(None)
+    return lambda: week._parse_response(WeekSchedule(json.loads(text)).days)
+
+
+def day_parse(text):
+    today = Today(None)
+    days = WeekSchedule(json.loads(text)).days
+    return lambda: today._parse_response(days, "tuesday")
+
+
+def week_call(text):
+    week = Week(StaticHTTPClient({KEITHFEM_BASE_URL + "week-info": text}))
+    week.send = send  # type: ignore
+    return lambda: week(None, None)
+
+
+def week_call_with_schedule(text):
+    client = StaticHTTPClient({KEITHFEM_BASE_URL + "week-info": text})
+    week = Week(client, schedule=WeekInfo(client))
+    week.send = send  # type: ignore
+    return lambda: week(None, None)
+
+
+def today_call_with_schedule(text):
+    client = StaticHTTPClient({KEITHFEM_BASE_URL + "week-info": text})
+    today = Today(client, schedule=WeekInfo(client))
+    today.send = send  # type: ignore
+    return lambda: today(None, None)
+
+
+def show_parse_format(text):
+    show = Show.from_airtime(json.loads(text)["currentShow"][0])
+    # Only the shows of today and tomorrow are displayed.
+    show = dataclasses.replace(show, starts=now(), ends=now())
+    command = Now(None)
+    return lambda: command._format(command._parse(show))
+
+
+def now_call(text):
+    command = Now(StaticHTTPClient({KEITHFEM_BASE_URL + "live-info": text}))
+    command.send = send  # type: ignore
+    return lambda: command(None, None)
+
+
+def benchmarks():
+    """The benchmarks by name, with the function they time"""
+    week_info = json.loads(fixture("response_week_info"))
+    live_info = fixture("response_live_info")
+    found = {
+        "show_parse_format": show_parse_format(live_info),
+        "now_call": now_call(live_info),
+    }
+    for factor in FACTORS:
+        text = json.dumps(scaled(week_info, factor))
+        for setup in (
+            week_parse,
+            day_parse,
+            week_call,
+            week_call_with_schedule,
+            today_call_with_schedule,
+        ):
+            found["%s[x%d]" % (setup.__name__, factor)] = setup(text)
+    return found
+
+
+def relative(function, repeat=7):
+    """Time of a call in reference units, and the time of the reference
+
+    Every timing of the function is paired with one of the reference taken
+    right next to it, as the speed of the machine drifts, and the median of
+    the ratios is kept.
+    """
+    timers = []
+    for timed in (reference, function):
+        timer = timeit.Timer(timed)
+        number, _ = timer.autorange()
+        timers.append((timer, number))
+    pairs = []
+    for _ in range(repeat):
+        pairs.append([timer.timeit(number) / number for timer, number in timers])
+    pairs.sort(key=lambda pair: pair[1] / pair[0])
+    unit, time = pairs[repeat // 2]
+    return time / unit, unit
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--update", action="store_true", help="store the times as the baselines"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.5,
+        help="slowdown over the baseline that fails, 0.5 by default",
+    )
+    parser.add_argument("--only", default="", help="only the benchmarks with this")
+    parser.add_argument(
+        "--runs",
+        type=int,
+        default=5,
+        help="runs of every benchmark whose median is stored with --update",
+    )
+    args = parser.parse_args(argv)
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    results = {}
+    regressions = []
+    print("%-34s %12s %10s %10s" % ("benchmark", "time (us)", "relative", "baseline"))
+    for name, function in benchmarks().items():
+        if args.only not in name:
+            continue
+        baseline = baselines.get(name)
+        if args.update:
+            runs = [relative(function) for _ in range(max(1, args.runs))]
+            time, unit = sorted(runs)[len(runs) // 2]
+        else:
+            time, unit = float("inf"), 0.0
+            for _ in range(RETRIES + 1):
+                time, unit = min((time, unit), relative(function))
+                if not baseline or time <= baseline * (1 + args.threshold):
+                    break
+        results[name] = float("%.4g" % time)
+        change = ""
+        if baseline:
+            change = "%+9.1f%%" % ((time / baseline - 1) * 100)
+            if time > baseline * (1 + args.threshold):
+                regressions.append(name)
+                change += " REGRESSION"
+        print("%-34s %12.2f %10.3f %s" % (name, time * unit * 1e6, time, change))
+
+    if args.update:
+        BASELINES.write_text(json.dumps({**baselines, **results}, indent=2) + "\n")
+        print("Baselines stored in %s" % BASELINES)
+        return 0
+    if regressions:
+        print("Slower than the baselines: %s" % ", ".join(regressions))
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
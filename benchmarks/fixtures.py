@@ -0,0 +1,70 @@
+"""Payloads of the benchmarks, built from the fixtures of tests/conftest.py."""
+
+import importlib.util
+import pathlib
+import random
+import time
+
+from clients.fakes.http import FakeHTTPClient
+from exceptions import HTTPError
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+def fixture(name):
+    """Returns the value of a fixture of tests/conftest.py"""
+    spec = importlib.util.spec_from_file_location(
+        "fixtures", ROOT / "tests" / "conftest.py"
+    )
+    module = importlib.util.module_from_spec(spec)  # type: ignore
+    spec.loader.exec_module(module)  # type: ignore
+    return getattr(module, name).__wrapped__()
+
+
+def scaled(response, factor):
+    """Repeats the shows of every day of a week-info response"""
+    return {
+        day: shows * factor
+        for day, shows in response.items()
+        if isinstance(shows, list)
+    }
+
+
+class StaticHTTPClient:
+    """Answers every request to a url with the same text, like a warm cache."""
+
+    def __init__(self, texts):
+        self.texts = texts
+
+    def get(self, url, headers=None):
+        return self.texts[url]
+
+    def close(self):
+        """Nothing to release"""
+
+
+class SlowHTTPClient(FakeHTTPClient):
+    """The fake HTTP client, also serving texts by url, with injected latency."""
+
+    def __init__(self, texts, latency=0.0, jitter=0.0, error_rate=0.0):
+        """Constructor
+
+        Args:
+            texts (dict): responses by url, the rest are served by FakeHTTPClient.
+            latency (float, optional): mean seconds of a request.
+            jitter (float, optional): standard deviation of the latency.
+            error_rate (float, optional): share of the requests failing.
+        """
+        super().__init__()
+        self.texts = texts
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+
+    def get(self, url, headers=None):
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        if random.random() < self.error_rate:
+            raise HTTPError("Injected upstream error")
+        if url in self.texts:
+            return self.texts[url]
+        return super().get(url, headers)
@@ -0,0 +1,242 @@
+"""Load generator firing synthetic telegram updates at the dispatcher.
+
+Builds the bot commands on a python-telegram-bot dispatcher, like keithfembot.py
+does, with airtime and the jokes served by fake HTTP clients with injected
+latency. Updates for a mix of commands are fired at a fixed rate, queued in
+the dispatcher or POSTed as raw JSON to the webhook server, and timed until
+their reply is handed to the sender. Reports the throughput, the latency
+percentiles and the error rate.
+
+    PYTHONPATH=src python benchmarks/loadgen.py --rate 50 --duration 10
+    PYTHONPATH=src python benchmarks/loadgen.py --mode webhook --mix now=3,week=1
+"""
+
+import argparse
+import collections
+import http.client
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fixtures import SlowHTTPClient, fixture
+from telegram import Bot, Update, User
+from telegram.ext import CommandHandler, Dispatcher
+
+from commands import Joke, Next, NextAirings, Now, Search, Today, Tomorrow, Week
+from config import KEITHFEM_BASE_URL
+from schedule import ScheduleRefresher
+from search import ShowIndex
+from webhook import SECRET_TOKEN_HEADER, WebhookServer
+
+SECRET = "load-test"
+MIX = "now=4,next=2,today=2,tomorrow=1,week=2,show=1,search=1,joke=1"
+ARGS = {"show": "Kraut Kontrol", "search": "kraut"}
+
+
+def update(update_id, command) -> dict:
+    """A telegram update with a command, in its own chat"""
+    text = "/%s %s" % (command, ARGS.get(command, ""))
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": update_id, "type": "private"},
+            "from": {"id": update_id, "is_bot": False, "first_name": "Load"},
+            "text": text.strip(),
+            "entities": [
+                {"type": "bot_command", "offset": 0, "length": len(command) + 1}
+            ],
+        },
+    }
+
+
+def percentile(values, share) -> float:
+    """Nearest rank percentile of sorted values"""
+    if not values:
+        return float("nan")
+    return values[min(len(values) - 1, int(share * len(values)))]
+
+
+class Recorder:
+    """Stands for the Sender, timing every update until its reply is sent."""
+
+    def __init__(self):
+        self.fired = {}  # type: ignore
+        self.latencies = collections.defaultdict(list)  # type: ignore
+        self.errors = collections.Counter()  # type: ignore
+        self.done = threading.Semaphore(0)
+        self._lock = threading.Lock()
+
+    def fire(self, update_id, command) -> None:
+        with self._lock:
+            self.fired[update_id] = (command, time.perf_counter())
+
+    def send(self, chat_id, **kwargs) -> None:
+        finished = time.perf_counter()
+        with self._lock:
+            command, fired = self.fired[chat_id]
+            self.latencies[command].append(finished - fired)
+        self.done.release()
+
+    def error(self, update, context) -> None:
+        with self._lock:
+            command, _ = self.fired[update.effective_chat.id]
+            self.errors[command] += 1
+        self.done.release()
+
+
+class OfflineBot(Bot):
+    """A bot that never asks telegram who it is"""
+
+    @property
+    def bot(self) -> User:
+        return User(123456, "KeithFemBot", is_bot=True, username="keithfembot")
+
+
+def dispatcher(http_client, workers):
+    """A dispatcher with the commands of the bot, replying to a Recorder"""
+    bot = OfflineBot("123456:load-test")
+    dp = Dispatcher(bot, queue.Queue(), workers=workers)
+    schedule = ScheduleRefresher(http_client)
+    schedule.refresh()
+    index = ShowIndex()
+    schedule.on_refresh(index.update)
+    commands = {
+        "now": Now(http_client, schedule=schedule),
+        "next": Next(http_client, schedule=schedule),
+        "today": Today(http_client, schedule=schedule),
+        "tomorrow": Tomorrow(http_client, schedule=schedule),
+        "week": Week(http_client, schedule=schedule),
+        "show": NextAirings(index, schedule),
+        "search": Search(index),
+        "joke": Joke(http_client),
+    }
+    for name, command in commands.items():
+        dp.add_handler(CommandHandler(name, command, run_async=True))  # type: ignore
+    recorder = Recorder()
+    dp.bot_data["sender"] = recorder
+    dp.add_error_handler(recorder.error)
+    return dp, recorder, schedule
+
+
+def post(port, body) -> None:
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        connection.request(
+            "POST",
+            "/telegram",
+            body=body,
+            headers={SECRET_TOKEN_HEADER: SECRET, "Content-Type": "application/json"},
+        )
+        connection.getresponse().read()
+    finally:
+        connection.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--mode", choices=("dispatcher", "webhook"), default="dispatcher"
+    )
+    parser.add_argument("--rate", type=float, default=50, help="updates per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds firing")
+    parser.add_argument("--mix", default=MIX, help="weights of the commands, " + MIX)
+    parser.add_argument("--workers", type=int, default=8, help="dispatcher workers")
+    parser.add_argument("--latency", type=float, default=0.05, help="upstream seconds")
+    parser.add_argument("--jitter", type=float, default=0.02, help="upstream jitter")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="upstream errors")
+    parser.add_argument("--drain", type=float, default=30, help="max seconds to wait")
+    args = parser.parse_args(argv)
+
+    http_client = SlowHTTPClient(
+        {
+            KEITHFEM_BASE_URL + "week-info": fixture("response_week_info"),
+            KEITHFEM_BASE_URL + "live-info": fixture("response_live_info"),
+        },
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+    )
+    dp, recorder, schedule = dispatcher(http_client, args.workers)
+    threading.Thread(target=dp.start, name="dispatcher", daemon=True).start()
+    webhook = None
+    if args.mode == "webhook":
+        webhook = WebhookServer(dp, SECRET, port=0)
+        webhook.start()
+        posting = ThreadPoolExecutor(max_workers=64)
+
+    weights = [item.split("=") for item in args.mix.split(",")]
+    # A deterministic interleaving of the mix, repeated.
+    cycle = [name for name, weight in weights for _ in range(int(weight))]
+    total = int(args.rate * args.duration)
+    started = time.perf_counter()
+    for update_id in range(1, total + 1):
+        delay = started + (update_id - 1) / args.rate - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        command = cycle[update_id % len(cycle)]
+        data = update(update_id, command)
+        recorder.fire(update_id, command)
+        if webhook is not None:
+            posting.submit(post, webhook.server_address[1], json.dumps(data).encode())
+        else:
+            dp.update_queue.put(Update.de_json(data, dp.bot))
+    fired_for = time.perf_counter() - started
+
+    deadline = time.perf_counter() + args.drain
+    finished = 0
+    while finished < total and recorder.done.acquire(
+        timeout=max(0.0, deadline - time.perf_counter())
+    ):
+        finished += 1
+    elapsed = time.perf_counter() - started
+
+    if webhook is not None:
+        posting.shutdown()
+        webhook.stop()
+    dp.stop()
+    schedule.stop()
+
+    latencies = sorted(
+        value for values in recorder.latencies.values() for value in values
+    )
+    errors = sum(recorder.errors.values())
+    print(
+        "%s mode, %d updates at %.0f/s (fired in %.1fs), %d workers, upstream %.0fms"
+        % (args.mode, total, args.rate, fired_for, args.workers, args.latency * 1000)
+    )
+    print(
+        "replied %d, errors %d (%.1f%%), unanswered %d, throughput %.1f replies/s"
+        % (
+            len(latencies),
+            errors,
+            errors / total * 100,
+            total - finished,
+            len(latencies) / elapsed,
+        )
+    )
+    print(
+        "%-10s %7s %9s %9s %9s %7s"
+        % ("command", "count", "p50 ms", "p95 ms", "p99 ms", "errors")
+    )
+    rows = dict(recorder.latencies, all=latencies)
+    for name, values in sorted(rows.items()):
+        values = sorted(values)
+        print(
+            "%-10s %7d %9.1f %9.1f %9.1f %7d"
+            % (
+                name,
+                len(values),
+                percentile(values, 0.50) * 1000,
+                percentile(values, 0.95) * 1000,
+                percentile(values, 0.99) * 1000,
+                errors if name == "all" else recorder.errors[name],
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
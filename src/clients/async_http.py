@@ -0,0 +1,67 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from clients.http import HTTPClient
+from config import ASYNC_HOST_LIMIT, ASYNC_TOTAL_TIMEOUT
+from exceptions import HTTPError
+
+
+class AsyncHTTPClient:
+    """Asyncio encapsulation of HTTPClient
+
+    Same contract as HTTPClient.get, but awaitable. Requests run on a thread
+    pool over the pooled sessions of HTTPClient (which owns the connect and read
+    timeouts), with a limit of concurrent requests per host and a total timeout.
+    Cancelling the caller frees its slot right away; the request in flight is
+    left to finish on its thread and its result is discarded.
+
+    Meant to be used from a single event loop.
+    """
+
+    def __init__(
+        self, http_client=None, limit_per_host=None, total_timeout=None, executor=None
+    ):
+        """Constructor
+
+        Args:
+            http_client (HTTPClient, optional): blocking client doing the requests.
+            limit_per_host (int, optional): max concurrent requests per host.
+            total_timeout (float, optional): max seconds for a whole request,
+                including the wait for a free slot.
+            executor (Executor, optional): runs the blocking requests.
+        """
+        self.http_client = http_client or HTTPClient()
+        self.limit_per_host = limit_per_host or ASYNC_HOST_LIMIT
+        self.total_timeout = total_timeout or ASYNC_TOTAL_TIMEOUT
+        self.executor = executor or ThreadPoolExecutor(thread_name_prefix="async-http")
+        self.semaphores = {}  # type: ignore
+
+    def _semaphore(self, url) -> asyncio.Semaphore:
+        """Returns the semaphore limiting the requests to the host of the url"""
+        host = urlsplit(url).netloc
+        semaphore = self.semaphores.get(host)
+        if semaphore is None:
+            semaphore = self.semaphores[host] = asyncio.Semaphore(self.limit_per_host)
+        return semaphore
+
+    async def _get(self, url, headers):
+        async with self._semaphore(url):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, self.http_client.get, url, headers
+            )
+
+    async def get(self, url, headers=None):
+        """HTTP GET"""
+        try:
+            return await asyncio.wait_for(self._get(url, headers), self.total_timeout)
+        except asyncio.TimeoutError as exec:
+            raise HTTPError(
+                "Timeout after %ss getting %s" % (self.total_timeout, url)
+            ) from exec
+
+    def close(self):
+        """Stops the thread pool and closes the blocking client"""
+        self.executor.shutdown(wait=False)
+        self.http_client.close()
@@ -0,0 +1,187 @@
+import datetime as dt
+import json
+import logging
+import threading
+import time
+
+from clients.singleflight import SingleFlight
+from config import (
+    LIVE_INFO_MAX_TTL,
+    LIVE_INFO_TTL,
+    SHOW_BOUNDARY_MARGIN,
+    STALE_MAX_AGE,
+)
+from exceptions import HTTPError
+
+logger = logging.getLogger(__name__)
+
+
+def spawn(target):
+    """Runs target in a daemon thread"""
+    threading.Thread(target=target, daemon=True).start()
+
+
+class CachedHTTPClient:
+    """Caches the responses of an HTTP client.
+
+    Only the urls with a TTL are cached, the rest go straight to the wrapped
+    client. A TTL is either a number of seconds or a callable that computes them
+    from the response. Concurrent misses for the same url are collapsed into a
+    single upstream request.
+
+    Once a response expires it is still served, up to max_stale seconds old,
+    while it is revalidated in the background. If the upstream fails the stale
+    response keeps being served until it gets too old.
+    """
+
+    def __init__(
+        self, http_client, ttls=None, max_stale=None, clock=time.monotonic, spawn=spawn
+    ):
+        """Constructor
+
+        Args:
+            http_client (Any): client with the same contract as HTTPClient.get
+            ttls (dict, optional): seconds to keep the response of each url, or
+                a callable receiving the response text and returning them.
+            max_stale (float, optional): max age in seconds of an expired
+                response to be served. 0 disables stale responses.
+            clock (Callable, optional): returns the current time in seconds.
+            spawn (Callable, optional): runs the background revalidations.
+        """
+        self.http_client = http_client
+        self.ttls = ttls or {}
+        self.max_stale = STALE_MAX_AGE if max_stale is None else max_stale
+        self.clock = clock
+        self.spawn = spawn
+        self.flight = SingleFlight()
+        self.entries = {}  # type: ignore
+        self.failed = set()  # type: ignore
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self.errors = 0
+        self._revalidating = set()  # type: ignore
+        self._lock = threading.Lock()
+
+    def _fetch(self, url, headers, ttl):
+        """Fetches the url from upstream and caches the response"""
+        try:
+            text = self.http_client.get(url=url, headers=headers)
+        except HTTPError:
+            self.failed.add(url)
+            self.errors += 1
+            raise
+        seconds = ttl(text) if callable(ttl) else ttl
+        now = self.clock()
+        self.entries[url] = (now + seconds, now, text)
+        self.failed.discard(url)
+        return text
+
+    def _revalidate(self, url, headers, ttl):
+        """Fetches the url in the background, unless it's already being fetched"""
+        with self._lock:
+            if url in self._revalidating:
+                return
+            self._revalidating.add(url)
+
+        def revalidate():
+            try:
+                self.flight.do(url, lambda: self._fetch(url, headers, ttl))
+            except HTTPError:
+                logger.warning("Cannot revalidate %s, serving it stale.", url)
+            finally:
+                with self._lock:
+                    self._revalidating.discard(url)
+
+        self.spawn(revalidate)
+
+    def get(self, url, headers=None):
+        """HTTP GET served from memory while the response is fresh enough"""
+        ttl = self.ttls.get(url)
+        if not ttl:
+            return self.http_client.get(url=url, headers=headers)
+
+        entry = self.entries.get(url)
+        if entry is not None:
+            expires_at, fetched_at, text = entry
+            now = self.clock()
+            if expires_at > now:
+                self.hits += 1
+                return text
+            if now - fetched_at <= self.max_stale:
+                self.stale += 1
+                self._revalidate(url, headers, ttl)
+                return text
+        self.misses += 1
+
+        def fetch():
+            # Someone else may have fetched it in the meantime.
+            entry = self.entries.get(url)
+            if entry is not None and entry[0] > self.clock():
+                return entry[2]
+            return self._fetch(url, headers, ttl)
+
+        return self.flight.do(url, fetch)
+
+    def hit_ratio(self) -> float:
+        """Share of the requests served from memory, fresh or stale"""
+        requests = self.hits + self.stale + self.misses
+        return (self.hits + self.stale) / requests if requests else 0.0
+
+    def stale_for(self, url):
+        """Seconds since the response for the url was fetched, if it's being
+        served stale because upstream is failing. None otherwise."""
+        entry = self.entries.get(url)
+        if entry is None or url not in self.failed:
+            return None
+        return self.clock() - entry[1]
+
+    def invalidate(self, url=None):
+        """Forgets the cached response for the url, or all of them"""
+        if url is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(url, None)
+
+    def close(self):
+        """Closes the wrapped client"""
+        self.http_client.close()
+
+
+class ShowBoundaryTTL:
+    """TTL for airtime live-info that expires when the current show ends or the
+    next one starts, whatever comes first.
+
+    A small margin is added past the boundary so airtime had time to switch shows.
+    """
+
+    def __init__(self, max_ttl=None, fallback_ttl=None, margin=None):
+        """Constructor
+
+        Args:
+            max_ttl (float, optional): upper bound in seconds, for long shows.
+            fallback_ttl (float, optional): seconds to use without a boundary.
+            margin (float, optional): seconds to wait after the boundary.
+        """
+        self.max_ttl = max_ttl or LIVE_INFO_MAX_TTL
+        self.fallback_ttl = fallback_ttl or LIVE_INFO_TTL
+        self.margin = SHOW_BOUNDARY_MARGIN if margin is None else margin
+
+    def _boundaries(self, response):
+        for node, key in (("currentShow", "ends"), ("nextShow", "starts")):
+            for show in response.get(node) or []:
+                yield dt.datetime.strptime(show[key][:19], "%Y-%m-%d %H:%M:%S")
+
+    def __call__(self, text) -> float:
+        try:
+            boundaries = list(self._boundaries(json.loads(text)))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return self.fallback_ttl
+
+        now = dt.datetime.now()
+        upcoming = [boundary for boundary in boundaries if boundary > now]
+        if not upcoming:
+            return self.fallback_ttl
+
+        seconds = (min(upcoming) - now).total_seconds() + self.margin
+        return min(seconds, self.max_ttl)
@@ -0,0 +1,9 @@
+from clients.fakes.http import FakeHTTPClient
+
+
+class FakeAsyncHTTPClient(FakeHTTPClient):
+    """Async version of FakeHTTPClient, for the same external services."""
+
+    async def get(self, url, headers=None):  # type: ignore
+        """HTTP GET"""
+        return super().get(url, headers)
@@ -17,3 +17,6 @@ class FakeHTTPClient:
             return (
                 "what do you call a dog that can do magic tricks?" " a labracadabrador"
             )
+
+    def close(self):
+        """Nothing to release"""
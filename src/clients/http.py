@@ -1,20 +1,139 @@
+import hashlib
+import threading
+from typing import NamedTuple, Union
+from urllib.parse import urlsplit
+
 import requests
+from requests.adapters import HTTPAdapter
 
+from config import (
+    HTTP_CONNECT_TIMEOUT,
+    HTTP_KEEP_ALIVE,
+    HTTP_POOL_SIZE,
+    HTTP_READ_TIMEOUT,
+)
 from exceptions import HTTPError
 
 
+class Validators(NamedTuple):
+    """What is known about the last response of an url"""
+
+    etag: Union[str, None]
+    last_modified: Union[str, None]
+    digest: str
+    text: str
+
+
 class HTTPClient:
-    """Requests encapsulation"""
+    """Requests encapsulation
+
+    Keeps a long-lived pooled session per upstream host, so every command
+    reuses an open TCP + TLS connection instead of doing a new handshake.
+
+    Requests are conditional (If-None-Match / If-Modified-Since) once an url
+    answered with validators. When the body didn't change, either on a 304 or
+    with the same digest, the very same text object is returned, so callers
+    can skip decoding it again with an identity check.
+    """
+
+    def __init__(
+        self,
+        http_client=None,
+        pool_size=None,
+        keep_alive=None,
+        connect_timeout=None,
+        read_timeout=None,
+    ):
+        """Constructor
 
-    def __init__(self, http_client=None):
-        self.http_client = http_client or requests
+        Args:
+            http_client (Any, optional): requests compatible client. When given
+                it is used as is for every host instead of the pooled sessions.
+            pool_size (int, optional): max connections kept open per host.
+            keep_alive (bool, optional): reuse connections between requests.
+            connect_timeout (float, optional): seconds to establish a connection.
+            read_timeout (float, optional): seconds to wait for the response.
+        """
+        self.http_client = http_client
+        self.pool_size = pool_size or HTTP_POOL_SIZE
+        self.keep_alive = HTTP_KEEP_ALIVE if keep_alive is None else keep_alive
+        self.timeout = (
+            connect_timeout or HTTP_CONNECT_TIMEOUT,
+            read_timeout or HTTP_READ_TIMEOUT,
+        )
+        self.sessions = {}  # type: ignore
+        self.validators = {}  # type: ignore
+        self._lock = threading.Lock()
+
+    def _session(self, url):
+        """Returns the pooled session for the host of the url"""
+        if self.http_client is not None:
+            return self.http_client
+
+        host = urlsplit(url).netloc
+        with self._lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                if not self.keep_alive:
+                    session.headers["Connection"] = "close"
+                self.sessions[host] = session
+        return session
+
+    def _conditional_headers(self, validators, headers):
+        """Adds the validators of the last response to the headers"""
+        if validators is None or not (validators.etag or validators.last_modified):
+            return headers
+
+        headers = dict(headers or {})
+        if validators.etag:
+            headers["If-None-Match"] = validators.etag
+        if validators.last_modified:
+            headers["If-Modified-Since"] = validators.last_modified
+        return headers
 
     def get(self, url, headers=None):
         """HTTP GET"""
+        validators = self.validators.get(url)
         try:
-            response = self.http_client.get(url=url, headers=headers)
+            response = self._session(url).get(
+                url=url,
+                headers=self._conditional_headers(validators, headers),
+                timeout=self.timeout,
+            )
+            if response.status_code == 304 and validators is not None:
+                return validators.text
             response.raise_for_status()
         except Exception as exec:
             raise HTTPError(str(exec)) from exec
 
-        return response.text
+        digest = hashlib.sha1(response.content).hexdigest()
+        if validators is not None and validators.digest == digest:
+            text = validators.text
+        else:
+            text = response.text
+        self.validators[url] = Validators(
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            digest=digest,
+            text=text,
+        )
+        return text
+
+    def version(self, url) -> Union[str, None]:
+        """Returns the ETag, or the digest, of the last response of the url"""
+        validators = self.validators.get(url)
+        if validators is None:
+            return None
+        return validators.etag or validators.digest
+
+    def close(self):
+        """Closes all the pooled sessions"""
+        with self._lock:
+            sessions, self.sessions = self.sessions, {}
+            self.validators = {}
+        for session in sessions.values():
+            session.close()
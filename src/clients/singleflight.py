@@ -0,0 +1,79 @@
+import threading
+
+
+class _Call:
+    """A call in flight, shared by all the callers with the same key"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapses concurrent calls with the same key into a single one.
+
+    The callers arriving while a call is in flight wait for it and share its
+    result, or its exception.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.coalesced = 0
+        self._calls = {}  # type: ignore
+        self._lock = threading.Lock()
+
+    def do(self, key, function):
+        """Calls function, unless a call with the same key is already in flight
+
+        Args:
+            key (Hashable): identifies the calls that can be collapsed.
+            function (Callable): what to call, without arguments.
+
+        Returns:
+            Any: the result of the call.
+        """
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+        except Exception as exec:
+            call.error = exec
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+
+class SingleFlightHTTPClient:
+    """Collapses concurrent GETs of the same url and headers into one request"""
+
+    def __init__(self, http_client, flight=None):
+        self.http_client = http_client
+        self.flight = flight or SingleFlight()
+
+    def get(self, url, headers=None):
+        """HTTP GET"""
+        key = (url, tuple(sorted((headers or {}).items())))
+        return self.flight.do(
+            key, lambda: self.http_client.get(url=url, headers=headers)
+        )
+
+    def close(self):
+        """Closes the wrapped client"""
+        self.http_client.close()
@@ -1,14 +1,35 @@
 import calendar
 import datetime as dt
-import html
 import json
 from typing import Tuple, Union
 
 from telegram import ParseMode, Update
 from telegram.ext import CallbackContext
-
-from config import DADJOKE_URL, KEITHFEM_BASE_URL
+from telegram.utils.helpers import escape_markdown
+
+from config import (
+    DADJOKE_URL,
+    KEITHFEM_BASE_URL,
+    PROFILE_ADMINS,
+    SEARCH_AIRINGS,
+    SEARCH_MAX_SHOWS,
+    SHOW_AIRINGS,
+    STALE_NOTICE,
+)
 from exceptions import NoShowException
+from formatting import (
+    DAY_TITLES,
+    SHOW_ON_AIR,
+    airings,
+    day_shows,
+    show_times,
+    week_shows,
+)
+from metrics import phase
+from models import Show, now
+from schedule import WEEK_DAYS, WeekSchedule
+from subscriptions import EVERY_SHOW
+from tracing import span
 
 
 class Command:
@@ -19,37 +40,37 @@ class Command:
         self.service_url = service_url
         self.headers = None
         self.msg = None
+        self.schedule = None
 
     def __call__(
         self, update: Union[Update, None], context: Union[CallbackContext, None]
     ) -> str:
-        self.send(update, context, self.msg)
+        msg = self.message()
+        self.send(update, context, msg)
+        return msg
+
+    def message(self) -> str:
+        """The message of the command, without sending it"""
         return self.msg
 
     def _get(self) -> str:
         """Gets info from external services"""
-        return self.http_client.get(
-            url=self.service_url,
-            headers=self.headers,
-        )
+        with phase("fetch"), span("http.get", url=self.service_url):
+            return self.http_client.get(
+                url=self.service_url,
+                headers=self.headers,
+            )
 
     def _parse(self, show) -> Tuple[str, str, str]:
         """Parses show name, start and end.
 
         Args:
-            show (dict): A dictionary with a name and start and end of a show.
+            show (Show): A show with a name and start and end.
 
         Returns:
             tuple: A tuple with start time, end time and name of the show (un-scaped)
         """
-        name = show["name"]
-        starts = show["starts"][-8:-3]
-        ends = show["ends"][-8:-3]
-        return (
-            starts,
-            ends,
-            html.unescape(name),
-        )
+        return show_times(show)
 
     def _format(self, show) -> str:
         """Formats a show info to be ready to be send
@@ -61,7 +82,21 @@ class Command:
             str: a show name in bold, and start and end time. Example:
                 Nocturnal Emissions (01:00 - 04:00 🇩🇪 time!)
         """
-        return "*%s* (%s - %s _🇩🇪 time!_)" % (show[2:] + show[:2])
+        return SHOW_ON_AIR % (show[2:] + show[:2])
+
+    def _stale_notice(self, msg) -> str:
+        """Tells how old the schedule is, when airtime cannot be reached
+
+        Args:
+            msg (str): message built from the schedule.
+
+        Returns:
+            str: the message, with "(cached N min ago)" if the schedule is stale.
+        """
+        stale_for = self.schedule.stale_for() if self.schedule else None
+        if not STALE_NOTICE or stale_for is None:
+            return msg
+        return msg + "\n_(cached %d min ago)_" % (stale_for // 60)
 
     def send(
         self,
@@ -69,12 +104,19 @@ class Command:
         context: Union[CallbackContext, None],
         msg=None,
     ) -> None:
-        """Send method from python-telegram-bot"""
-        context.bot.send_message(  # type: ignore
-            chat_id=update.effective_chat.id,  # type: ignore
-            text=msg or self.msg,
-            parse_mode=ParseMode.MARKDOWN,
-        )
+        """Send method from python-telegram-bot
+
+        Goes through the rate limited sender in bot_data when there's one.
+        """
+        sender = context.bot_data.get("sender")  # type: ignore
+        send_message = sender.send if sender else context.bot.send_message  # type: ignore
+        chat_id = update.effective_chat.id  # type: ignore
+        with phase("send"), span("telegram.send", chat_id=chat_id):
+            send_message(
+                chat_id=chat_id,
+                text=msg or self.msg,
+                parse_mode=ParseMode.MARKDOWN,
+            )
         return msg or self.msg
 
 
@@ -111,6 +153,10 @@ class Help(Command):
             "`/today`: displays the schedule for today.\n"
             "`/tomorrow`: displays the schedule for tomorrow.\n"
             "`/week`: displays the shows for the week.\n"
+            "`/show <name>`: displays the next airings of a show.\n"
+            "`/search <text>`: when are the shows matching the text on.\n"
+            "`/subscribe <show>`: get a message when the show starts, or any with `all`.\n"
+            "`/unsubscribe [show]`: stop the messages of a show, or all of them.\n"
             "`/joke`: KeithF'em BotMeister, tell me a joke.\n"
             "`/donate`: donate to Keith F'em.\n"
             "`/help`: this help.\n"
@@ -140,7 +186,7 @@ class Joke(Command):
 class ShowCommand(Command):
     """Base class for single show display"""
 
-    def __init__(self, node, http_client, service_url=None):
+    def __init__(self, node, http_client, service_url=None, schedule=None):
         """Constructor
 
         Args:
@@ -148,151 +194,220 @@ class ShowCommand(Command):
             http_client (Any): mock compatible with requests
             service_url (str, optional): Url of the service to hit (airtime).
                 Defaults to KEITHFEM_BASE_URL + 'live-info'.
+            schedule (WeekInfo, optional): when given, the show is looked up
+                in the week schedule instead of hitting live-info.
         """
         super().__init__()
         self.http_client = http_client
         self.service_url = service_url or KEITHFEM_BASE_URL + "live-info"
         self.node = node
+        self.schedule = schedule
         self.no_show_message = ""
 
     def _parse(self, show) -> Tuple[str, str, str]:
         # Only Parse if the show is today or tomorrow
         today = dt.date.today().weekday()
         tomorrow = (dt.date.today() + dt.timedelta(days=1)).weekday()
-        day_of_show = dt.datetime.strptime(
-            show["starts"], "%Y-%m-%d %H:%M:%S"
-        ).weekday()
 
-        if day_of_show not in [today, tomorrow]:
+        if show.starts.weekday() not in [today, tomorrow]:
             raise NoShowException
 
         return super()._parse(show)
 
-    def __call__(
-        self, update: Union[Update, None], context: Union[CallbackContext, None]
-    ) -> str:
-        response = json.loads(self._get())
+    def _locate(self, schedule, when) -> Union[Show, None]:
+        """Finds the show to display in the week schedule"""
+        raise NotImplementedError
+
+    def _show(self) -> Show:
+        """Returns the show to display, from the schedule or from live-info"""
+        if self.schedule is None:
+            text = self._get()
+            with span("parse", node=self.node):
+                return Show.from_airtime(json.loads(text)[self.node][0])
+
+        with phase("fetch"), span("schedule.snapshot"):
+            week = self.schedule.snapshot()
+        show = self._locate(week, now())
+        if show is None:
+            raise NoShowException
+        return show
 
+    def message(self) -> str:
         try:
-            msg = self._format(self._parse(response[self.node][0]))  # type: ignore
+            msg = self._format(self._parse(self._show()))
         except (IndexError, NoShowException):
             msg = (
                 self.no_show_message + "\nCheck the weekly schedule with /week command."
             )
-
-        self.send(update, context, msg)
-        return msg
+        return self._stale_notice(msg)
 
 
 class Now(ShowCommand):
     """Displays the show that is on air at the moment."""
 
-    def __init__(self, http_client, service_url=None, node="currentShow"):
+    def __init__(
+        self, http_client, service_url=None, node="currentShow", schedule=None
+    ):
         super().__init__(
             node=node,
             http_client=http_client,
             service_url=service_url,
+            schedule=schedule,
         )
         self.no_show_message = "Nothing being broadcasted at the moment 🥺."
 
+    def _locate(self, schedule, when) -> Union[Show, None]:
+        return schedule.at(when)
+
 
 class Next(ShowCommand):
     """Displays the show that comes after the current one on air."""
 
-    def __init__(self, http_client, service_url=None, node="nextShow"):
+    def __init__(self, http_client, service_url=None, node="nextShow", schedule=None):
         super().__init__(
             node=node,
             http_client=http_client,
             service_url=service_url,
+            schedule=schedule,
         )
         self.no_show_message = "Nothing else scheduled for today 🥺."
 
+    def _locate(self, schedule, when) -> Union[Show, None]:
+        return schedule.after(when)
 
-class DayCommand(Command):
-    """Base class for daily show display"""
 
-    def __init__(self, http_client, service_url=None):
+class WeekInfoCommand(Command):
+    """Base class for the commands displaying the week-info schedule"""
+
+    def __init__(self, http_client, service_url=None, schedule=None):
+        """Constructor
+
+        Args:
+            http_client (Any): mock compatible with requests
+            service_url (str, optional): Url of the service to hit (airtime).
+                Defaults to KEITHFEM_BASE_URL + 'week-info'.
+            schedule (WeekInfo, optional): shared week schedule, used instead
+                of fetching and decoding week-info on every call.
+        """
         super().__init__()
         self.http_client = http_client
         self.service_url = service_url or KEITHFEM_BASE_URL + "week-info"
+        self.schedule = schedule
+        self._rendered = (None, {})  # type: ignore
+
+    def _week(self) -> WeekSchedule:
+        """Returns the week-info schedule"""
+        if self.schedule is None:
+            text = self._get()
+            with span("json.loads"):
+                response = json.loads(text)
+            with span("parse"):
+                return WeekSchedule(response)
+        with phase("fetch"), span("schedule.snapshot"):
+            return self.schedule.snapshot()
+
+    def _render(self, week, key, render) -> str:
+        """Memoizes the messages rendered from a version of the schedule
+
+        Args:
+            week (WeekSchedule): the schedule the message is rendered from.
+            key (str): what is rendered, like the day of the week.
+            render (Callable): renders the message when it isn't memoized.
+
+        Returns:
+            str: the rendered message.
+        """
+        if week.version is None:
+            with span("format", key=key):
+                return render()
+
+        version, messages = self._rendered
+        if version != week.version:
+            # Only the latest version is kept, the older ones won't be asked again.
+            messages = {}
+            self._rendered = (week.version, messages)
+        msg = messages.get(key)
+        if msg is None:
+            with span("format", key=key):
+                msg = messages[key] = render()
+        return msg
+
+
+class DayCommand(WeekInfoCommand):
+    """Base class for daily show display"""
+
+    def __init__(self, http_client, service_url=None, schedule=None):
+        super().__init__(http_client, service_url, schedule)
         self.no_shows_message = ""
-        self.on_day = None
 
     def _parse_response(self, response, day) -> str:
         """From a response, it returns a string with the shows of the day
 
         Args:
-            response (dict): A dict with the shows for the week.
+            response (dict): The shows of the week by day.
             day (str): day of the week to be parsed
 
         Returns:
             str: A string with all the shows for the day
         """
-        shows_msg = ""
-        for show in response[day.lower()]:
-            shows_msg += "(%s - %s) - *%s*\n" % super()._parse(show)
-        return shows_msg
+        return day_shows(response[day.lower()])
 
     def _format(self, day) -> str:
-        return "Shows for %s _🇩🇪 time!_\n" % (day.replace("next", "")).capitalize()
+        return "Shows for %s _🇩🇪 time!_\n" % DAY_TITLES[day.lower()]
 
-    def __call__(
-        self, update: Union[Update, None], context: Union[CallbackContext, None]
-    ) -> str:
-        response = json.loads(self._get())
-        shows = self._parse_response(response, self.on_day)
+    def _on_day(self) -> str:
+        """The day of the week-info response to display.
+
+        Computed on every call rather than stored, as handlers run concurrently.
+        """
+        raise NotImplementedError
+
+    def _message(self, response, on_day) -> str:
+        """Builds the message with the shows of the day, or the lack of them"""
+        shows = self._parse_response(response, on_day)
         if shows:
-            msg = self._format(self.on_day) + shows
-        else:
-            msg = (
-                self.no_shows_message
-                + "\nCheck the weekly schedule with /week command."
-            )
+            return self._format(on_day) + shows
+        return self.no_shows_message + "\nCheck the weekly schedule with /week command."
 
-        self.send(update, context, msg)
-        return msg
+    def message(self) -> str:
+        on_day = self._on_day()
+        week = self._week()
+        msg = self._render(week, on_day, lambda: self._message(week.days, on_day))
+        return self._stale_notice(msg)
 
 
 class Today(DayCommand):
     """Displays the radio schedule for today"""
 
-    def __init__(self, http_client, service_url=None):
-        super().__init__(http_client, service_url)
+    def __init__(self, http_client, service_url=None, schedule=None):
+        super().__init__(http_client, service_url, schedule)
         self.no_shows_message = "No shows are scheduled for today 🤷."
 
-    def __call__(
-        self, update: Union[Update, None], context: Union[CallbackContext, None]
-    ) -> str:
-        today = dt.date.today()
-        self.on_day = calendar.day_name[today.weekday()].lower()
-        return super().__call__(update, context)
+    def _on_day(self) -> str:
+        return WEEK_DAYS[dt.date.today().weekday()]
 
 
 class Tomorrow(DayCommand):
     """Displays the radio schedule for tomorrow"""
 
-    def __init__(self, http_client, service_url=None):
-        super().__init__(http_client, service_url)
+    def __init__(self, http_client, service_url=None, schedule=None):
+        super().__init__(http_client, service_url, schedule)
         self.no_shows_message = "No shows are scheduled for tomorrow 🤷."
 
-    def __call__(
-        self, update: Union[Update, None], context: Union[CallbackContext, None]
-    ) -> str:
+    def _on_day(self) -> str:
         tomorrow = dt.date.today() + dt.timedelta(days=1)
-        self.on_day = calendar.day_name[tomorrow.weekday()].lower()
+        on_day = WEEK_DAYS[tomorrow.weekday()]
         # if tomorrow is monday, fetches 'nextmonday' on the array
-        if self.on_day.lower() == calendar.day_name[calendar.firstweekday()].lower():
-            self.on_day = "next" + self.on_day
-        return super().__call__(update, context)
+        if on_day == WEEK_DAYS[calendar.firstweekday()]:
+            on_day = "next" + on_day
+        return on_day
 
 
-class Week(Command):
+class Week(WeekInfoCommand):
     """Displays the radio schedule for the week"""
 
-    def __init__(self, http_client, service_url=None):
-        super().__init__()
-        self.http_client = http_client
-        self.service_url = service_url or KEITHFEM_BASE_URL + "week-info"
+    def __init__(self, http_client, service_url=None, schedule=None):
+        super().__init__(http_client, service_url, schedule)
         self.no_shows_message = (
             "No shows for the week. This day should haven't arrived. 😭"
         )
@@ -301,36 +416,220 @@ class Week(Command):
         """From a response, it returns the shows for the week
 
         Args:
-            response (dict): A dict with the shows for the week.
+            response (dict): The shows of the week by day.
 
         Returns:
             str: A string with all the shows for the week
         """
-        msg = ""
-        days_of_the_week = []
-        for day_number in range(0, 7):
-            days_of_the_week.append(calendar.day_name[day_number].lower())
-
-        for day in response:
-            if day not in days_of_the_week:
-                continue
-            shows = ""
-            for show in response[day]:
-                shows += "(%s - %s) - *%s*\n" % super()._parse(show)
+        return week_shows(response) or self.no_shows_message
+
+    def message(self) -> str:
+        week = self._week()
+        msg = self._render(week, "week", lambda: self._parse_response(week.days))
+        return self._stale_notice(msg)
+
+
+class Subscribe(Command):
+    """Notifies the chat when a show, or every show, starts"""
+
+    def __init__(self, subscriptions, index):
+        super().__init__()
+        self.subscriptions = subscriptions
+        self.index = index
+        self.msg = "Tell me which show, e.g. `/subscribe Nocturnal Emissions` or `/subscribe all`."
+
+    def __call__(
+        self, update: Union[Update, None], context: Union[CallbackContext, None]
+    ) -> str:
+        name = " ".join(context.args or [])  # type: ignore
+        if not name:
+            msg = self.msg
+        elif name.casefold() == EVERY_SHOW:
+            self.subscriptions.add(update.effective_chat.id, EVERY_SHOW)  # type: ignore
+            msg = "You'll get a message when any show starts 📻"
+        else:
+            show = self.show(name)
+            if show is None:
+                msg = (
+                    "No show matches _%s_ 🤷\n"
+                    "Check the weekly schedule with /week command."
+                    % escape_markdown(name)
+                )
+            else:
+                self.subscriptions.add(update.effective_chat.id, show)  # type: ignore
+                msg = "You'll get a message when *%s* starts 📻" % escape_markdown(show)
+
+        self.send(update, context, msg)
+        return msg
+
+    def show(self, name) -> Union[str, None]:
+        """The name of the scheduled show, or else the closest one, if any"""
+        names = self.index.names
+        key = name.casefold()
+        if key not in names:
+            key = next(iter(self.index.search(name, limit=1)), None)
+        return names.get(key)
+
+
+class Unsubscribe(Command):
+    """Stops the notifications of a show, or all of them"""
+
+    def __init__(self, subscriptions, index):
+        super().__init__()
+        self.subscriptions = subscriptions
+        self.index = index
+
+    def __call__(
+        self, update: Union[Update, None], context: Union[CallbackContext, None]
+    ) -> str:
+        chat_id = update.effective_chat.id  # type: ignore
+        name = " ".join(context.args or []) or None  # type: ignore
+        show = self.show(chat_id, name) if name else None
+        if name is None:
+            removed = self.subscriptions.remove(chat_id)
+        else:
+            removed = show is not None and self.subscriptions.remove(chat_id, show)
+        if not removed:
+            msg = "You weren't subscribed to %s 🤷" % (
+                "*%s*" % escape_markdown(name) if name else "any show"
+            )
+        elif name is None:
+            msg = "No more messages when the shows start 👋"
+        else:
+            msg = "No more messages for *%s* 👋" % escape_markdown(
+                self.index.names.get(show, show)
+            )
+
+        self.send(update, context, msg)
+        return msg
+
+    def show(self, chat_id, name) -> Union[str, None]:
+        """The show of the chat with that name, or else the closest one, if any"""
+        shows = self.subscriptions.shows_for(chat_id)
+        key = name.casefold()
+        if key in shows:
+            return key
+        return next((key for key in self.index.search(name) if key in shows), None)
+
+
+class Search(Command):
+    """Displays the upcoming airings of the shows matching a text"""
+
+    def __init__(self, index, max_shows=None, max_airings=None):
+        super().__init__()
+        self.index = index
+        self.max_shows = max_shows or SEARCH_MAX_SHOWS
+        self.max_airings = max_airings or SEARCH_AIRINGS
+        self.msg = "Tell me what to look for, e.g. `/search kraut`."
+
+    def __call__(
+        self, update: Union[Update, None], context: Union[CallbackContext, None]
+    ) -> str:
+        text = " ".join(context.args or [])  # type: ignore
+        msg = self.results(text) if text else self.msg
+
+        self.send(update, context, msg)
+        return msg
+
+    def matches(self, text) -> list:
+        """The next airings of the shows matching a text, a list per show"""
+        when = now()
+        matches = []
+        for key in self.index.search(text):
+            shows = self.index.upcoming(key, when, self.max_airings)
             if shows:
-                msg += "*Shows for %s*\n" % (day.capitalize(),) + shows
-        if msg:
-            msg += "_ All shows are in 🇩🇪 time!_"
+                matches.append(shows)
+            if len(matches) == self.max_shows:
+                break
+        return matches
+
+    def results(self, text) -> str:
+        """The message with the shows matching a text"""
+        matches = self.matches(text)
+        if matches:
+            return "\n".join(map(airings, matches)) + "_ All shows are in 🇩🇪 time!_"
+        return "No upcoming shows match _%s_ 🤷" % escape_markdown(text)
+
+
+class NextAirings(Command):
+    """Displays the next airings of a show, this week and the next one"""
+
+    def __init__(self, index, schedule, count=None):
+        super().__init__()
+        self.index = index
+        self.schedule = schedule
+        self.count = count or SHOW_AIRINGS
+        self.msg = "Tell me which show, e.g. `/show Kraut Kontrol`."
+
+    def __call__(
+        self, update: Union[Update, None], context: Union[CallbackContext, None]
+    ) -> str:
+        name = " ".join(context.args or [])  # type: ignore
+        if not name:
+            self.send(update, context, self.msg)
+            return self.msg
+
+        with phase("fetch"), span("schedule.snapshot"):
+            week = self.schedule.snapshot()
+        # The exact name, or else the closest one.
+        key = name.casefold()
+        if key not in week.ids:
+            key = next(iter(self.index.search(name, limit=1)), key)
+        shows = week.upcoming(week.ids.get(key), now(), self.count)
+        if shows:
+            msg = airings(shows) + "_ All shows are in 🇩🇪 time!_"
         else:
-            msg = self.no_shows_message
+            msg = (
+                "No upcoming airings of _%s_ 🤷\n"
+                "Check the weekly schedule with /week command." % escape_markdown(name)
+            )
+        msg = self._stale_notice(msg)
 
+        self.send(update, context, msg)
         return msg
 
+
+class Profile(Command):
+    """Profiles the commands for the admins, e.g. `/profile on now 0.1`"""
+
+    def __init__(self, profiler, admins=None):
+        super().__init__()
+        self.profiler = profiler
+        self.admins = PROFILE_ADMINS if admins is None else admins
+        self.msg = (
+            "`/profile on <command> [sample rate]`, "
+            "`/profile off [command]` or `/profile dump`."
+        )
+
     def __call__(
         self, update: Union[Update, None], context: Union[CallbackContext, None]
     ) -> str:
-        response = json.loads(self._get())
-        msg = self._parse_response(response)
+        if update.effective_user.id not in self.admins:  # type: ignore
+            msg = "Only the admins of the bot can profile it 🙅"
+        else:
+            msg = self.run(context.args or [])  # type: ignore
 
         self.send(update, context, msg)
         return msg
+
+    def run(self, args) -> str:
+        """The reply to the arguments of /profile"""
+        action, args = (args[0], args[1:]) if args else ("", [])
+        if action == "on" and 1 <= len(args) <= 2:
+            try:
+                rate = float(args[1]) if len(args) == 2 else 1.0
+                self.profiler.enable(args[0], rate)
+            except ValueError as exc:
+                return escape_markdown(str(exc))
+            return "Profiling %.0f%% of `/%s` 🔬" % (rate * 100, args[0])
+        if action == "off" and len(args) <= 1:
+            self.profiler.disable(args[0] if args else None)
+            return "Profiling stopped for %s 🛑" % (
+                "`/%s`" % args[0] if args else "every command"
+            )
+        if action == "dump" and not args:
+            paths = self.profiler.dump()
+            if not paths:
+                return "Nothing profiled yet 🤷"
+            return "Profiles dumped:\n" + "\n".join("`%s`" % path for path in paths)
+        return self.msg
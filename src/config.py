@@ -4,3 +4,88 @@ HTTP_API_TOKEN = os.environ.get("HTTP_API_TOKEN", "")
 KEITHFEM_BASE_URL = os.environ.get("KEITHFEM_BASE_URL", "")
 DADJOKE_URL = os.environ.get("DADJOKE_URL", "")
 TIMEZONE = os.environ.get("TIMEZONE", "Europe/London")
+
+# Webhook mode, used instead of polling when WEBHOOK_URL is set. WEBHOOK_URL is
+# the public url (without WEBHOOK_PATH) telegram POSTs the updates to.
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8080"))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram")
+
+# Threads handling the updates concurrently.
+WORKERS = int(os.environ.get("WORKERS", "8"))
+
+# Connection pooling and timeouts (in seconds) for the upstream services.
+HTTP_POOL_SIZE = int(os.environ.get("HTTP_POOL_SIZE", "10"))
+HTTP_KEEP_ALIVE = os.environ.get("HTTP_KEEP_ALIVE", "true").lower() == "true"
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "10"))
+ASYNC_HOST_LIMIT = int(os.environ.get("ASYNC_HOST_LIMIT", "10"))
+ASYNC_TOTAL_TIMEOUT = float(os.environ.get("ASYNC_TOTAL_TIMEOUT", "15"))
+
+# Seconds to keep the Airtime responses in memory.
+LIVE_INFO_TTL = float(os.environ.get("LIVE_INFO_TTL", "30"))
+WEEK_INFO_TTL = float(os.environ.get("WEEK_INFO_TTL", "300"))
+# live-info is kept until the next show change, up to LIVE_INFO_MAX_TTL seconds.
+LIVE_INFO_MAX_TTL = float(os.environ.get("LIVE_INFO_MAX_TTL", "3600"))
+SHOW_BOUNDARY_MARGIN = float(os.environ.get("SHOW_BOUNDARY_MARGIN", "5"))
+
+# Background refresh of the schedule, in seconds.
+SCHEDULE_REFRESH_INTERVAL = float(os.environ.get("SCHEDULE_REFRESH_INTERVAL", "60"))
+SCHEDULE_REFRESH_JITTER = float(os.environ.get("SCHEDULE_REFRESH_JITTER", "10"))
+SCHEDULE_MAX_STALENESS = float(os.environ.get("SCHEDULE_MAX_STALENESS", "600"))
+
+# Max age in seconds of a schedule served while airtime cannot be reached, and
+# whether to tell the users how old it is.
+STALE_MAX_AGE = float(os.environ.get("STALE_MAX_AGE", "3600"))
+STALE_NOTICE = os.environ.get("STALE_NOTICE", "true").lower() == "true"
+
+# Outgoing messages: per second to all the chats, per minute and at once to a chat.
+SEND_GLOBAL_RATE = float(os.environ.get("SEND_GLOBAL_RATE", "30"))
+SEND_CHAT_RATE = float(os.environ.get("SEND_CHAT_RATE", "20"))
+SEND_CHAT_BURST = int(os.environ.get("SEND_CHAT_BURST", "3"))
+
+# SQLite database with the subscriptions and the chat settings. Writes are
+# batched up to STORE_BATCH_SIZE, or flushed every STORE_FLUSH_INTERVAL seconds.
+STORE_PATH = os.environ.get("STORE_PATH", "keithfembot.sqlite3")
+STORE_BATCH_SIZE = int(os.environ.get("STORE_BATCH_SIZE", "100"))
+STORE_FLUSH_INTERVAL = float(os.environ.get("STORE_FLUSH_INTERVAL", "1"))
+# Whether this process notifies the subscribed chats. Only one of the processes
+# sharing a database should.
+NOTIFIER = os.environ.get("NOTIFIER", "true").lower() == "true"
+
+# /search: share of the trigrams a show name must match, shows and airings shown.
+SEARCH_MIN_SCORE = float(os.environ.get("SEARCH_MIN_SCORE", "0.5"))
+SEARCH_MAX_SHOWS = int(os.environ.get("SEARCH_MAX_SHOWS", "5"))
+SEARCH_AIRINGS = int(os.environ.get("SEARCH_AIRINGS", "3"))
+# /show: airings of the show displayed.
+SHOW_AIRINGS = int(os.environ.get("SHOW_AIRINGS", "5"))
+
+# Max seconds telegram caches the answers to inline queries, they are also
+# refreshed when the show on air changes.
+INLINE_CACHE_TIME = int(os.environ.get("INLINE_CACHE_TIME", "300"))
+
+# Local endpoint prometheus scrapes the metrics from, on /metrics.
+METRICS = os.environ.get("METRICS", "true").lower() == "true"
+METRICS_LISTEN = os.environ.get("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9090"))
+
+# Tracing of the commands: "none", "stdout", "file" (JSON lines in TRACING_FILE)
+# or "otlp" (OTLP/HTTP JSON to an OpenTelemetry collector).
+TRACING_EXPORTER = os.environ.get("TRACING_EXPORTER", "none")
+TRACING_FILE = os.environ.get("TRACING_FILE", "spans.jsonl")
+TRACING_OTLP_ENDPOINT = os.environ.get(
+    "TRACING_OTLP_ENDPOINT", "http://127.0.0.1:4318/v1/traces"
+)
+TRACING_SERVICE_NAME = os.environ.get("TRACING_SERVICE_NAME", "keithfembot")
+
+# /profile: telegram user ids allowed to profile the commands, comma separated,
+# where the profiles are dumped and seconds between the samples of the stacks.
+PROFILE_ADMINS = frozenset(
+    int(user_id)
+    for user_id in os.environ.get("PROFILE_ADMINS", "").split(",")
+    if user_id
+)
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.005"))
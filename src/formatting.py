@@ -0,0 +1,98 @@
+import calendar
+from typing import Tuple
+
+from schedule import DAYS, WEEK_DAYS
+
+SHOW_LINE = "(%s - %s) - *%s*\n"
+SHOW_ON_AIR = "*%s* (%s - %s _🇩🇪 time!_)"
+AIRING_LINE = "%s %d %s %s - %s\n"
+
+# Titles of the days in the week-info response, computed once.
+DAY_TITLES = {day: day.replace("next", "").capitalize() for day in DAYS}
+
+
+def clock(time) -> str:
+    """Formats the time of a datetime ("20:00")"""
+    return "%02d:%02d" % (time.hour, time.minute)
+
+
+def show_times(show) -> Tuple[str, str, str]:
+    """Start time, end time and name of a show
+
+    Args:
+        show (Show): A show with a name and start and end.
+
+    Returns:
+        tuple: ("01:00", "04:00", "name")
+    """
+    return (clock(show.starts), clock(show.ends), show.name)
+
+
+def on_air(show) -> str:
+    """A show name in bold, and start and end time
+
+    Args:
+        show (Show): A show with a name and start and end.
+
+    Returns:
+        str: Nocturnal Emissions (01:00 - 04:00 🇩🇪 time!)
+    """
+    return SHOW_ON_AIR % (show.name, clock(show.starts), clock(show.ends))
+
+
+def day_shows(shows) -> str:
+    """One line per show with its times and name
+
+    Args:
+        shows (Iterable): the Shows of a day.
+
+    Returns:
+        str: (20:00 - 22:00) - *Hardcore Tuesdays*
+    """
+    return "".join([SHOW_LINE % show_times(show) for show in shows])
+
+
+def week_shows(days) -> str:
+    """The shows of this week, grouped by day
+
+    Args:
+        days (dict): the Shows of the week-info response by day.
+
+    Returns:
+        str: The shows of every day with any, or an empty string.
+    """
+    parts = []
+    for day in WEEK_DAYS:
+        shows = days.get(day)
+        if shows:
+            parts.append("*Shows for %s*\n" % DAY_TITLES[day])
+            parts.extend([SHOW_LINE % show_times(show) for show in shows])
+    if parts:
+        parts.append("_ All shows are in 🇩🇪 time!_")
+    return "".join(parts)
+
+
+def airings(shows) -> str:
+    """The name of a show and one line per airing with its day and times
+
+    Args:
+        shows (Iterable): airings of the same show, in order.
+
+    Returns:
+        str: *Hardcore Tuesdays* and lines like "Tuesday 29 Dec 20:00 - 22:00".
+    """
+    parts = ["*%s*\n" % shows[0].name]
+    parts.extend(
+        [
+            AIRING_LINE
+            % (
+                WEEK_DAYS[show.starts.weekday()].capitalize(),
+                show.starts.day,
+                calendar.month_abbr[show.starts.month],
+                clock(show.starts),
+                clock(show.ends),
+            )
+            for show in shows
+        ]
+    )
+    return "".join(parts)
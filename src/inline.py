@@ -0,0 +1,110 @@
+import hashlib
+import math
+from typing import Union
+
+from telegram import (
+    InlineQueryResultArticle,
+    InputTextMessageContent,
+    ParseMode,
+    Update,
+)
+from telegram.ext import CallbackContext
+
+from config import INLINE_CACHE_TIME
+from formatting import airings
+from models import now
+
+TITLES = {
+    "now": "On air now",
+    "next": "Next show",
+    "today": "Today's shows",
+    "tomorrow": "Tomorrow's shows",
+    "week": "This week's shows",
+}
+
+
+def show_id(name) -> str:
+    """A result id of a show, unique by name and within telegram's 64 bytes"""
+    return "show-" + hashlib.sha1(name.casefold().encode()).hexdigest()[:16]
+
+
+def article(id, title, text) -> InlineQueryResultArticle:
+    """An inline result sending a message with the first line as description"""
+    return InlineQueryResultArticle(
+        id=id,
+        title=title,
+        description=text.split("\n", 1)[0].replace("*", "").replace("_", ""),
+        input_message_content=InputTextMessageContent(
+            text, parse_mode=ParseMode.MARKDOWN
+        ),
+    )
+
+
+class InlineQuery:
+    """Answers inline queries like "@keithfembot now" or "@keithfembot kraut"
+
+    The answers are the messages of the schedule commands, rendered from the
+    schedule snapshot, so they cost no request to airtime. They are the same for
+    every user, so telegram can cache them until the show on air changes.
+    """
+
+    def __init__(self, commands, search, schedule, cache_time=None):
+        """Constructor
+
+        Args:
+            commands (dict): the schedule commands by name, like "now".
+            search (Search): the /search command, for any other query.
+            schedule (ScheduleRefresher): schedule the commands are rendered from.
+            cache_time (int, optional): max seconds telegram caches an answer.
+        """
+        self.commands = commands
+        self.search = search
+        self.schedule = schedule
+        self.cache_time = cache_time or INLINE_CACHE_TIME
+
+    def results(self, query) -> list:
+        """The results of an inline query
+
+        Args:
+            query (str): the text after the bot name. The names of the commands
+                starting with it, or else a show search. Every command if empty.
+
+        Returns:
+            list: InlineQueryResultArticles.
+        """
+        text = " ".join(query.split())
+        names = [name for name in self.commands if name.startswith(text.casefold())]
+        if names:
+            return [
+                article(name, TITLES.get(name, name), self.commands[name].message())
+                for name in names
+            ]
+        return [
+            article(
+                show_id(shows[0].name),
+                shows[0].name,
+                airings(shows) + "_ All shows are in 🇩🇪 time!_",
+            )
+            for shows in self.search.matches(text)
+        ]
+
+    def _cache_time(self) -> int:
+        """Seconds until the show on air changes, up to cache_time"""
+        week = self.schedule.snapshot()
+        when = now()
+        show, upcoming = week.at(when), week.after(when)
+        changes = [show.ends] if show else []
+        changes += [upcoming.starts] if upcoming else []
+        if not changes:
+            return self.cache_time
+        until = math.ceil((min(changes) - when).total_seconds())
+        return max(1, min(self.cache_time, until))
+
+    def __call__(
+        self, update: Union[Update, None], context: Union[CallbackContext, None]
+    ) -> list:
+        results = self.results(update.inline_query.query)  # type: ignore
+        update.inline_query.answer(  # type: ignore
+            results, cache_time=self._cache_time(), is_personal=False
+        )
+        return results
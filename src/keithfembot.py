@@ -1,12 +1,51 @@
 import logging
 import os
+import signal
+import threading
 import time
 
-from telegram.ext import CallbackContext, CommandHandler, Updater
+from telegram.ext import CallbackContext, CommandHandler, InlineQueryHandler, Updater
 
+from clients.cache import CachedHTTPClient, ShowBoundaryTTL
 from clients.http import HTTPClient
-from commands import About, Donate, Help, Joke, Next, Now, Today, Tomorrow, Week
-from config import HTTP_API_TOKEN, TIMEZONE
+from commands import (
+    About,
+    Donate,
+    Help,
+    Joke,
+    Next,
+    NextAirings,
+    Now,
+    Profile,
+    Search,
+    Subscribe,
+    Today,
+    Tomorrow,
+    Unsubscribe,
+    Week,
+)
+from config import (
+    HTTP_API_TOKEN,
+    KEITHFEM_BASE_URL,
+    METRICS,
+    NOTIFIER,
+    TIMEZONE,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+    WEBHOOK_URL,
+    WEEK_INFO_TTL,
+    WORKERS,
+)
+from inline import InlineQuery
+from metrics import Metrics, MetricsServer
+from profiler import Profiler
+from schedule import ScheduleRefresher
+from search import ShowIndex
+from sender import Sender
+from store import Store
+from subscriptions import Notifier, Subscriptions
+from tracing import exporter, tracer
+from webhook import WebhookServer
 
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
@@ -22,32 +61,142 @@ def error_handler(update: object, context: CallbackContext) -> None:
     context.bot.send_message(update, context, message)
 
 
+def start_webhook(updater: Updater) -> WebhookServer:
+    """Receives the updates on the built-in webhook server instead of polling."""
+    dp = updater.dispatcher  # type: ignore
+    webhook = WebhookServer(dp, WEBHOOK_SECRET)
+    dp.bot.set_webhook(
+        url=WEBHOOK_URL + WEBHOOK_PATH, api_kwargs={"secret_token": WEBHOOK_SECRET}
+    )
+    threading.Thread(target=dp.start, name="dispatcher", daemon=True).start()
+    webhook.start()
+    return webhook
+
+
+def stop_on_signals(signals=(signal.SIGINT, signal.SIGTERM)) -> threading.Event:
+    """Returns an event set when one of the signals is received.
+
+    Replaces Updater.idle() in webhook mode: the updater isn't polling then,
+    and its own handler exits at once, skipping the cleanup.
+    """
+    stop = threading.Event()
+    for signum in signals:
+        signal.signal(signum, lambda signum, frame: stop.set())
+    return stop
+
+
 def main(http_client=None) -> None:
     """Starts the bot."""
 
     os.environ["TZ"] = TIMEZONE
     time.tzset()  # Unix only function
 
-    updater = Updater(token=HTTP_API_TOKEN, use_context=True)
+    updater = Updater(token=HTTP_API_TOKEN, use_context=True, workers=WORKERS)
 
     dp = updater.dispatcher  # type: ignore
 
-    http_client = http_client or HTTPClient()
-
-    dp.add_handler(CommandHandler("about", About()))  # type: ignore
-    dp.add_handler(CommandHandler("help", Help()))  # type: ignore
-    dp.add_handler(CommandHandler("joke", Joke(http_client)))  # type: ignore
-    dp.add_handler(CommandHandler("donate", Donate()))  # type: ignore
-    dp.add_handler(CommandHandler("now", Now(http_client)))  # type: ignore
-    dp.add_handler(CommandHandler("next", Next(http_client)))  # type: ignore
-    dp.add_handler(CommandHandler("today", Today(http_client)))  # type: ignore
-    dp.add_handler(CommandHandler("tomorrow", Tomorrow(http_client)))  # type: ignore
-    dp.add_handler(CommandHandler("week", Week(http_client)))  # type: ignore
+    upstream = http_client or HTTPClient()
+    http_client = CachedHTTPClient(
+        upstream,
+        ttls={
+            KEITHFEM_BASE_URL + "live-info": ShowBoundaryTTL(),
+            KEITHFEM_BASE_URL + "week-info": WEEK_INFO_TTL,
+        },
+    )
+
+    # Replies are queued and sent within telegram's rate limits.
+    sender = Sender(dp.bot)
+    sender.start()
+    dp.bot_data["sender"] = sender
+
+    # Schedule commands read the snapshot kept fresh in the background, from the
+    # responses cached until their TTL expires.
+    schedule = ScheduleRefresher(http_client)
+    schedule.start()
+
+    # Subscribed chats are notified when their shows start, by a single process
+    # of the ones sharing the store.
+    store = Store()
+    store.start()
+    subscriptions = Subscriptions(store)
+    notifier = Notifier(subscriptions, sender) if NOTIFIER else None
+    if notifier is not None:
+        schedule.on_refresh(notifier.schedule)
+        notifier.start()
+
+    # /search and /show look up the show names indexed on every new schedule.
+    index = ShowIndex()
+    schedule.on_refresh(index.update)
+
+    commands = {
+        "about": About(),
+        "help": Help(),
+        "joke": Joke(http_client),
+        "donate": Donate(),
+        "now": Now(http_client, schedule=schedule),
+        "next": Next(http_client, schedule=schedule),
+        "today": Today(http_client, schedule=schedule),
+        "tomorrow": Tomorrow(http_client, schedule=schedule),
+        "week": Week(http_client, schedule=schedule),
+        "show": NextAirings(index, schedule),
+        "search": Search(index),
+        "subscribe": Subscribe(subscriptions, index),
+        "unsubscribe": Unsubscribe(subscriptions, index),
+    }
+    # The admins profile a share of the calls of a command with /profile.
+    profiler = Profiler()
+    commands["profile"] = Profile(profiler)
+    # Every handler is traced when TRACING_EXPORTER is set, and measured. The
+    # metrics are served on METRICS_PORT.
+    tracer.exporter = exporter()
+    metrics = Metrics()
+    metrics.watch_cache(http_client)
+    metrics.watch_sender(sender)
+    metrics.watch_schedule(schedule)
+    metrics_server = MetricsServer(metrics) if METRICS else None
+
+    for name, command in commands.items():
+        # Runs on the dispatcher workers, so a slow command doesn't block polling.
+        handler = metrics.instrument(
+            name, tracer.traced(name, profiler.profiled(name, command))
+        )
+        dp.add_handler(CommandHandler(name, handler, run_async=True))  # type: ignore
+
+    # "@keithfembot now" in any chat, answered from the same schedule.
+    inline = InlineQuery(
+        {name: commands[name] for name in ("now", "next", "today", "tomorrow", "week")},
+        commands["search"],
+        schedule,
+    )
+    handler = metrics.instrument("inline", tracer.traced("inline", inline))
+    dp.add_handler(InlineQueryHandler(handler, run_async=True))  # type: ignore
 
     dp.add_error_handler(error_handler)
 
-    updater.start_polling()
-    updater.idle()
+    webhook = None
+    if metrics_server is not None:
+        metrics_server.start()
+    try:
+        if WEBHOOK_URL:
+            stop = stop_on_signals()
+            webhook = start_webhook(updater)
+            stop.wait()
+        else:
+            updater.start_polling()
+            updater.idle()
+    finally:
+        if webhook is not None:
+            webhook.stop()
+            dp.stop()
+        if metrics_server is not None:
+            metrics_server.stop()
+        schedule.stop()
+        if notifier is not None:
+            notifier.stop()
+        sender.stop()
+        store.close()
+        tracer.close()
+        http_client.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,323 @@
+import contextlib
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from config import METRICS_LISTEN, METRICS_PORT
+from exceptions import HTTPError
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds, from a cached reply to a slow upstream.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# Time spent in every phase by the command running in the thread.
+_local = threading.local()
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Adds the time spent in the block to a phase of the running command
+
+    Args:
+        name (str): "fetch" or "send", the queueing of the reply. The rest of
+            a call is "format".
+    """
+    phases = getattr(_local, "phases", None)
+    if phases is None:
+        yield
+        return
+    clock = _local.clock
+    started = clock()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + clock() - started
+
+
+def _labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = (
+        '%s="%s"' % (name, str(value).replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+    return "{%s}" % ",".join(pairs)
+
+
+class Counter:
+    """A value that only goes up, by labels"""
+
+    type = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}  # type: ignore
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = sorted(self.values.items())
+        for key, value in values:
+            yield self.name + _labels(self.labels, key), value
+
+
+class Gauge(Counter):
+    """A value read when the metrics are collected, like the counters of a client"""
+
+    def __init__(self, name, help, read, type="gauge"):
+        super().__init__(name, help)
+        self.read = read
+        self.type = type
+
+    def samples(self):
+        value = self.read()
+        yield self.name, "NaN" if value is None else value
+
+
+class Histogram(Counter):
+    """Counts of the observed values by bucket, by labels"""
+
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels) -> None:
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # A count per bucket, then +Inf, then the sum.
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self.values.items())
+        names = self.labels + ("le",)
+        for key, counts in values:
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                yield self.name + "_bucket" + _labels(names, key + (bound,)), count
+            yield self.name + "_sum" + _labels(self.labels, key), counts[-1]
+            yield self.name + "_count" + _labels(self.labels, key), counts[-2]
+
+
+class Metrics:
+    """Metrics of the commands and of the clients they use
+
+    Every command is wrapped with instrument(), which counts its calls and its
+    errors and splits its latency in the fetch, format and send phases.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.metrics = []  # type: ignore
+        self.calls = self.add(
+            Counter(
+                "keithfembot_command_calls_total",
+                "Commands handled.",
+                ("command", "outcome"),
+            )
+        )
+        self.http_errors = self.add(
+            Counter(
+                "keithfembot_command_http_errors_total",
+                "Commands failing because an upstream service did.",
+                ("command",),
+            )
+        )
+        self.latency = self.add(
+            Histogram(
+                "keithfembot_command_seconds",
+                "Time spent handling a command, by phase.",
+                ("command", "phase"),
+            )
+        )
+
+    def add(self, metric):
+        """Adds a metric to the exposed ones"""
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help, read, type="gauge") -> Gauge:
+        """Adds a metric read from a callable when collected"""
+        return self.add(Gauge(name, help, read, type))
+
+    def instrument(self, name, command):
+        """Wraps a command to measure its calls
+
+        Args:
+            name (str): the name of the command, like "now".
+            command (Command): the command.
+
+        Returns:
+            Callable: the command, measured.
+        """
+
+        def instrumented(update, context):
+            phases = _local.phases = {}
+            _local.clock = self.clock
+            started = self.clock()
+            outcome = "ok"
+            try:
+                return command(update, context)
+            except HTTPError:
+                outcome = "error"
+                self.http_errors.inc(command=name)
+                raise
+            except Exception:
+                outcome = "error"
+                raise
+            finally:
+                _local.phases = None
+                total = self.clock() - started
+                fetch = phases.get("fetch", 0.0)
+                send = phases.get("send", 0.0)
+                self.latency.observe(fetch, command=name, phase="fetch")
+                self.latency.observe(total - fetch - send, command=name, phase="format")
+                self.latency.observe(send, command=name, phase="send")
+                self.calls.inc(command=name, outcome=outcome)
+
+        return instrumented
+
+    def watch_cache(self, cache) -> None:
+        """Exposes the counters of a CachedHTTPClient"""
+        for result in ("hits", "stale", "misses", "errors"):
+            self.gauge(
+                "keithfembot_cache_%s_total" % result,
+                "Requests to the HTTP cache: %s." % result,
+                lambda result=result: getattr(cache, result),
+                type="counter",
+            )
+        self.gauge(
+            "keithfembot_cache_hit_ratio",
+            "Requests served from the HTTP cache, fresh or stale.",
+            cache.hit_ratio,
+        )
+        self.gauge(
+            "keithfembot_cache_coalesced_total",
+            "Cache misses that waited for the same request in flight.",
+            lambda: cache.flight.coalesced,
+            type="counter",
+        )
+
+    def watch_sender(self, sender) -> None:
+        """Exposes the counters of the Sender and the latency of telegram"""
+        for name, help in (
+            ("depth", "Messages waiting to be sent."),
+            ("sent", "Messages sent."),
+            ("retries", "Messages retried after telegram's flood control."),
+            ("failed", "Messages telegram refused."),
+        ):
+            self.gauge(
+                "keithfembot_sender_%s" % name,
+                help,
+                lambda name=name: getattr(sender, name),
+            )
+        self.gauge(
+            "keithfembot_sender_wait_seconds_total",
+            "Time the sent messages waited in the queue.",
+            lambda: sender.wait_total,
+            type="counter",
+        )
+        self.gauge(
+            "keithfembot_sender_wait_max_seconds",
+            "Longest time a sent message waited in the queue.",
+            lambda: sender.wait_max,
+        )
+        self.add(sender.latency)
+
+    def watch_schedule(self, schedule) -> None:
+        """Exposes the age of the ScheduleRefresher snapshot"""
+        self.gauge(
+            "keithfembot_schedule_staleness_seconds",
+            "Seconds since the schedule was refreshed.",
+            lambda: schedule.staleness,
+        )
+        self.gauge(
+            "keithfembot_schedule_refreshes_coalesced_total",
+            "Schedule refreshes that waited for the one in flight.",
+            lambda: schedule.flight.coalesced,
+            type="counter",
+        )
+
+    def render(self) -> str:
+        """The metrics in the prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics:
+            lines.append("# HELP %s %s" % (metric.name, metric.help))
+            lines.append("# TYPE %s %s" % (metric.name, metric.type))
+            lines.extend("%s %s" % (name, value) for name, value in metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    """Serves the metrics on GET /metrics"""
+
+    server: "MetricsServer"
+
+    def do_GET(self) -> None:
+        if self.path != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        body = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args) -> None:
+        logger.debug(format, *args)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """Local HTTP server for prometheus to scrape the metrics"""
+
+    daemon_threads = True
+
+    def __init__(self, metrics, listen=None, port=None):
+        """Constructor
+
+        Args:
+            metrics (Metrics): the metrics to expose.
+            listen (str, optional): address to listen to.
+            port (int, optional): port to listen to. 0 picks a free one.
+        """
+        self.metrics = metrics
+        self._thread = None
+        super().__init__(
+            (listen or METRICS_LISTEN, METRICS_PORT if port is None else port),
+            MetricsHandler,
+        )
+
+    def start(self) -> None:
+        """Serves the metrics in a background thread"""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="metrics", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops serving and releases the socket"""
+        self.shutdown()
+        self.server_close()
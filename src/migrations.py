@@ -0,0 +1,44 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Applied in order. The schema version is the number of applied migrations, kept
+# in SQLite's user_version. Never edit a released migration, append a new one.
+MIGRATIONS = [
+    """
+    CREATE TABLE subscriptions (
+        chat_id INTEGER NOT NULL,
+        show TEXT NOT NULL,
+        PRIMARY KEY (chat_id, show)
+    ) WITHOUT ROWID;
+    CREATE INDEX subscriptions_show ON subscriptions (show, chat_id);
+    """,
+    """
+    CREATE TABLE chat_settings (
+        chat_id INTEGER PRIMARY KEY,
+        timezone TEXT,
+        language TEXT
+    );
+    """,
+]
+
+
+def migrate(connection, migrations=None) -> int:
+    """Applies the migrations missing in a database
+
+    Args:
+        connection (sqlite3.Connection): database to migrate.
+        migrations (list, optional): SQL scripts, MIGRATIONS by default.
+
+    Returns:
+        int: the schema version of the database.
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    (version,) = connection.execute("PRAGMA user_version").fetchone()
+    for number, script in enumerate(migrations[version:], start=version + 1):
+        logger.info("Migrating the database to version %s.", number)
+        # executescript commits first, so every migration goes in its own transaction.
+        connection.executescript(
+            "BEGIN;\n%s\nPRAGMA user_version = %d;\nCOMMIT;" % (script, number)
+        )
+    return max(version, len(migrations))
@@ -0,0 +1,55 @@
+import datetime as dt
+import html
+from dataclasses import dataclass
+from typing import Union
+from zoneinfo import ZoneInfo
+
+from config import TIMEZONE
+
+TZ = ZoneInfo(TIMEZONE)
+
+
+def parse_datetime(value) -> dt.datetime:
+    """Parses an airtime date ("2020-12-27 20:00:00[.000000]") in TIMEZONE"""
+    return dt.datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S").replace(tzinfo=TZ)
+
+
+def now() -> dt.datetime:
+    """Current time in TIMEZONE"""
+    return dt.datetime.now(TZ)
+
+
+@dataclass(frozen=True, slots=True)
+class Show:
+    """A show of the airtime schedule, parsed once."""
+
+    id: Union[int, None]
+    instance_id: Union[int, None]
+    name: str
+    starts: dt.datetime
+    ends: dt.datetime
+
+    @classmethod
+    def from_airtime(cls, show) -> "Show":
+        """Builds a Show from an airtime show
+
+        Args:
+            show (dict): A show of the live-info or week-info responses.
+
+        Returns:
+            Show: the show with aware datetimes and the name un-escaped.
+        """
+        return cls(
+            id=show.get("id"),
+            instance_id=show.get("instance_id"),
+            name=html.unescape(show["name"]),
+            starts=parse_datetime(show["starts"]),
+            ends=parse_datetime(show["ends"]),
+        )
+
+    @property
+    def key(self):
+        """Identifies an airing of the show"""
+        if self.instance_id is None:
+            return (self.starts, self.name)
+        return self.instance_id
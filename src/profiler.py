@@ -0,0 +1,173 @@
+import collections
+import cProfile
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+
+from config import PROFILE_DIR, PROFILE_SAMPLE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class Sampler(threading.Thread):
+    """Samples the stack of a thread, counting the collapsed stacks"""
+
+    def __init__(self, thread_id, stacks, interval, root):
+        """Constructor
+
+        Args:
+            thread_id (int): the thread running the profiled call.
+            stacks (Counter): counts of the collapsed stacks, updated.
+            interval (float): seconds between the samples.
+            root (code): code of the frame the stacks start after.
+        """
+        super().__init__(name="sampler", daemon=True)
+        self.thread_id = thread_id
+        self.stacks = stacks
+        self.interval = interval
+        self.root = root
+        self.done = threading.Event()
+
+    def sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        names = []
+        while frame is not None and frame.f_code is not self.root:
+            code = frame.f_code
+            names.append("%s:%s" % (os.path.basename(code.co_filename), code.co_name))
+            frame = frame.f_back
+        if names:
+            self.stacks[";".join(reversed(names))] += 1
+
+    def run(self) -> None:
+        while not self.done.wait(self.interval):
+            self.sample()
+
+
+class Profiler:
+    """Profiles a share of the calls of some commands, toggled at runtime
+
+    The sampled calls run under cProfile, aggregated in memory by command, while
+    a thread samples their stacks for flame graphs. Only a call at a time is
+    profiled, the concurrent ones run as usual.
+    """
+
+    def __init__(self, directory=None, interval=None, random=random.random):
+        """Constructor
+
+        Args:
+            directory (str, optional): where the profiles are dumped.
+            interval (float, optional): seconds between the stack samples.
+            random (Callable, optional): returns a float in [0, 1).
+        """
+        self.directory = directory or PROFILE_DIR
+        self.interval = interval or PROFILE_SAMPLE_INTERVAL
+        self.random = random
+        self.commands = set()  # type: ignore
+        self.rates = {}  # type: ignore
+        self.stats = {}  # type: ignore
+        self.stacks = collections.defaultdict(collections.Counter)  # type: ignore
+        self.calls = collections.Counter()  # type: ignore
+        self._running = threading.Lock()
+        self._lock = threading.Lock()
+
+    def enable(self, name, rate=1.0) -> None:
+        """Profiles a share of the calls of a command
+
+        Args:
+            name (str): the name of a profiled() command.
+            rate (float, optional): share of the calls, in (0, 1].
+        """
+        if name not in self.commands:
+            raise ValueError("Unknown command %r." % name)
+        if not 0 < rate <= 1:
+            raise ValueError("The sample rate must be in (0, 1].")
+        self.rates[name] = rate
+
+    def disable(self, name=None) -> None:
+        """Stops profiling a command, or every command"""
+        if name is None:
+            self.rates.clear()
+        else:
+            self.rates.pop(name, None)
+
+    def profiled(self, name, command):
+        """Wraps a command handler so its calls can be profiled
+
+        Args:
+            name (str): the name of the command, like "now".
+            command (Callable): the handler.
+
+        Returns:
+            Callable: the handler, profiled when enabled.
+        """
+        self.commands.add(name)
+
+        def profiled(update, context):
+            rate = self.rates.get(name)
+            if rate is None or self.random() >= rate:
+                return command(update, context)
+            if not self._running.acquire(blocking=False):
+                return command(update, context)
+            try:
+                return self._profile(name, command, update, context)
+            finally:
+                self._running.release()
+
+        return profiled
+
+    def _profile(self, name, command, update, context):
+        profile = cProfile.Profile()
+        stacks = collections.Counter()  # type: ignore
+        sampler = Sampler(
+            threading.get_ident(), stacks, self.interval, sys._getframe().f_code
+        )
+        sampler.start()
+        profile.enable()
+        try:
+            return command(update, context)
+        finally:
+            profile.disable()
+            sampler.done.set()
+            sampler.join()
+            with self._lock:
+                if name in self.stats:
+                    self.stats[name].add(profile)
+                else:
+                    self.stats[name] = pstats.Stats(profile)
+                self.stacks[name].update(stacks)
+                self.calls[name] += 1
+
+    def dump(self) -> list:
+        """Writes the profiles gathered so far, and starts over
+
+        Every command gets a .pstats file, for pstats or snakeviz, and a
+        .collapsed one with a stack per line, for flamegraph.pl or speedscope.
+
+        Returns:
+            list: the paths of the written files.
+        """
+        with self._lock:
+            stats, self.stats = self.stats, {}
+            stacks, self.stacks = self.stacks, collections.defaultdict(
+                collections.Counter
+            )
+            self.calls.clear()
+
+        os.makedirs(self.directory, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        paths = []
+        for name, profile in stats.items():
+            path = os.path.join(self.directory, "%s-%s" % (name, stamp))
+            profile.dump_stats(path + ".pstats")
+            with open(path + ".collapsed", "w") as collapsed:
+                collapsed.writelines(
+                    "%s %d\n" % (stack, count)
+                    for stack, count in stacks[name].most_common()
+                )
+            paths += [path + ".pstats", path + ".collapsed"]
+        logger.info("Profiles dumped to %s.", ", ".join(paths) or "nowhere")
+        return paths
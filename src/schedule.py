@@ -0,0 +1,308 @@
+import bisect
+import calendar
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from typing import Union
+
+from clients.singleflight import SingleFlight
+from config import (
+    KEITHFEM_BASE_URL,
+    SCHEDULE_MAX_STALENESS,
+    SCHEDULE_REFRESH_INTERVAL,
+    SCHEDULE_REFRESH_JITTER,
+    STALE_MAX_AGE,
+)
+from exceptions import HTTPError
+from models import Show
+
+logger = logging.getLogger(__name__)
+
+WEEK_DAYS = [day.lower() for day in calendar.day_name]
+# Days in the order airtime sends them in the week-info response.
+DAYS = WEEK_DAYS + ["next" + day for day in WEEK_DAYS]
+
+
+def version(text) -> str:
+    """Content hash of an airtime response"""
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+class WeekSchedule:
+    """Shows of an airtime week-info response, parsed once and indexed by time."""
+
+    def __init__(self, response, live_info=None, version=None, days=None):
+        """Constructor
+
+        Args:
+            response (dict): airtime week-info response.
+            live_info (dict, optional): airtime live-info response. Its current
+                and next shows take precedence over the ones in the week.
+            version (str, optional): identifies the week-info response, so
+                what is rendered from the days can be reused.
+            days (dict, optional): the days of a WeekSchedule of the same
+                week-info response, reused instead of parsing response again.
+        """
+        self.version = version
+        if days is None:
+            days = {
+                day: tuple(Show.from_airtime(show) for show in response.get(day) or [])
+                for day in DAYS
+            }
+        self.days = days
+
+        shows = {show.key: show for day in DAYS for show in self.days[day]}
+        for node in ("currentShow", "nextShow"):
+            for show in (live_info or {}).get(node) or []:
+                live_show = Show.from_airtime(show)
+                shows[live_show.key] = live_show
+
+        self.shows = sorted(shows.values(), key=lambda show: show.starts)
+        self.starts = [show.starts for show in self.shows]
+
+        # Airings of every show in order, keyed by show id (by name without one).
+        airings = {}  # type: ignore
+        self.ids = {}
+        for show in self.shows:
+            show_id = show.name if show.id is None else show.id
+            airings.setdefault(show_id, []).append(show)
+            self.ids[show.name.casefold()] = show_id
+        self.occurrences = {
+            show_id: ([show.starts for show in shows], shows)
+            for show_id, shows in airings.items()
+        }
+
+    def at(self, when) -> Union[Show, None]:
+        """Returns the show on air at a given time, if any"""
+        index = bisect.bisect_right(self.starts, when) - 1
+        if index >= 0 and self.shows[index].ends > when:
+            return self.shows[index]
+        return None
+
+    def after(self, when) -> Union[Show, None]:
+        """Returns the first show starting after a given time, if any"""
+        index = bisect.bisect_right(self.starts, when)
+        if index < len(self.shows):
+            return self.shows[index]
+        return None
+
+    def upcoming(self, show_id, when, count) -> list:
+        """Returns the next airings of a show
+
+        Args:
+            show_id (int): id of the show, or its name if it has none.
+            when (datetime): time to look forward from.
+            count (int): max number of airings.
+
+        Returns:
+            list: the Shows on air or starting after when, in order.
+        """
+        starts, shows = self.occurrences.get(show_id, ([], []))
+        index = bisect.bisect_right(starts, when)
+        if index and shows[index - 1].ends > when:
+            index -= 1
+        end = index + count
+        return shows[index:end]
+
+
+class WeekInfo:
+    """Keeps a WeekSchedule of the airtime week-info.
+
+    The index is only rebuilt when the response changes, so behind a cached
+    HTTP client commands get the same WeekSchedule without any upstream request.
+    """
+
+    def __init__(self, http_client, service_url=None):
+        self.http_client = http_client
+        self.service_url = service_url or KEITHFEM_BASE_URL + "week-info"
+        self._text = None
+        self._schedule = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> WeekSchedule:
+        """Returns the WeekSchedule for the latest week-info"""
+        text = self.http_client.get(url=self.service_url, headers=None)
+        with self._lock:
+            if self._schedule is None or (
+                text is not self._text and text != self._text
+            ):
+                self._schedule = WeekSchedule(json.loads(text), version=version(text))
+                self._text = text
+            return self._schedule
+
+    def stale_for(self) -> Union[float, None]:
+        """Seconds since week-info was fetched, if it's being served stale"""
+        stale_for = getattr(self.http_client, "stale_for", None)
+        return stale_for(self.service_url) if stale_for else None
+
+
+class ScheduleRefresher:
+    """Keeps a WeekSchedule of week-info and live-info fresh in a background thread.
+
+    Every refresh builds a new WeekSchedule and swaps it in one assignment, so the
+    commands reading it never wait for airtime. When airtime is down the last
+    WeekSchedule is served until it's older than max_stale seconds.
+
+    The http_client is usually a CachedHTTPClient, so week-info and live-info are
+    only fetched from airtime when their TTL expires.
+
+    Listeners are called with every new WeekSchedule swapped in.
+    """
+
+    def __init__(
+        self,
+        http_client,
+        week_info_url=None,
+        live_info_url=None,
+        interval=None,
+        jitter=None,
+        max_staleness=None,
+        max_stale=None,
+        clock=time.time,
+    ):
+        """Constructor
+
+        Args:
+            http_client (Any): client with the same contract as HTTPClient.get
+            week_info_url (str, optional): Defaults to KEITHFEM_BASE_URL + 'week-info'.
+            live_info_url (str, optional): Defaults to KEITHFEM_BASE_URL + 'live-info'.
+            interval (float, optional): seconds between refreshes.
+            jitter (float, optional): max seconds added or removed to the interval.
+            max_staleness (float, optional): seconds after the last successful
+                refresh for the schedule to be considered unhealthy.
+            max_stale (float, optional): max seconds after the last successful
+                refresh for the schedule to be served.
+            clock (Callable, optional): returns the current time in seconds.
+        """
+        self.http_client = http_client
+        self.week_info_url = week_info_url or KEITHFEM_BASE_URL + "week-info"
+        self.live_info_url = live_info_url or KEITHFEM_BASE_URL + "live-info"
+        self.interval = interval or SCHEDULE_REFRESH_INTERVAL
+        self.jitter = SCHEDULE_REFRESH_JITTER if jitter is None else jitter
+        self.max_staleness = max_staleness or SCHEDULE_MAX_STALENESS
+        self.max_stale = max_stale or STALE_MAX_AGE
+        self.clock = clock
+        self.refreshed_at = None
+        self.listeners = []  # type: ignore
+        self.flight = SingleFlight()
+        self._texts = None
+        self._schedule = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def refresh(self) -> WeekSchedule:
+        """Fetches week-info and live-info and swaps in the new WeekSchedule
+
+        The background thread and snapshot() can refresh at the same time, the
+        later one waits for the refresh in flight and gets its WeekSchedule.
+        """
+        return self.flight.do("refresh", self._refresh)
+
+    def _refresh(self) -> WeekSchedule:
+        week_info = self.http_client.get(url=self.week_info_url, headers=None)
+        try:
+            live_info = self.http_client.get(url=self.live_info_url, headers=None)
+        except HTTPError:
+            logger.warning("Cannot refresh live-info, using week-info only.")
+            live_info = None
+
+        schedule = self._schedule
+        if schedule is None or self._texts != (week_info, live_info):
+            # live-info changes with every track, week-info seldom: its days
+            # are only parsed again when its text does.
+            if schedule is not None and self._same(self._texts[0], week_info):
+                schedule = WeekSchedule(
+                    None,
+                    json.loads(live_info) if live_info else None,
+                    version=schedule.version,
+                    days=schedule.days,
+                )
+            else:
+                schedule = WeekSchedule(
+                    json.loads(week_info),
+                    json.loads(live_info) if live_info else None,
+                    version=version(week_info),
+                )
+            self._schedule = schedule
+            self._texts = (week_info, live_info)
+            self._notify(schedule)
+        # Behind a CachedHTTPClient, week-info is served stale while airtime
+        # fails, so the schedule is as old as the cached response.
+        stale_for = getattr(self.http_client, "stale_for", None)
+        age = stale_for(self.week_info_url) if stale_for else None
+        self.refreshed_at = self.clock() - (age or 0.0)
+        return self._schedule
+
+    @staticmethod
+    def _same(text, other) -> bool:
+        # The clients return the very same text object for an unchanged response.
+        return text is other or text == other
+
+    def on_refresh(self, listener) -> None:
+        """Calls listener with every new WeekSchedule"""
+        self.listeners.append(listener)
+        if self._schedule is not None:
+            listener(self._schedule)
+
+    def _notify(self, schedule) -> None:
+        for listener in self.listeners:
+            try:
+                listener(schedule)
+            except Exception:
+                logger.exception("Cannot notify the new schedule to %s.", listener)
+
+    def snapshot(self) -> WeekSchedule:
+        """Returns the latest WeekSchedule. Only blocks before the first refresh or
+        when the latest one is too old to be served."""
+        schedule = self._schedule
+        staleness = self.staleness
+        if schedule is None or staleness is None or staleness > self.max_stale:
+            schedule = self.refresh()
+        return schedule
+
+    def stale_for(self) -> Union[float, None]:
+        """Seconds since the last successful refresh, if it's unhealthy"""
+        return None if self.healthy else self.staleness
+
+    @property
+    def staleness(self) -> Union[float, None]:
+        """Seconds since the last successful refresh"""
+        if self.refreshed_at is None:
+            return None
+        return self.clock() - self.refreshed_at
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the schedule was refreshed recently enough"""
+        staleness = self.staleness
+        return staleness is not None and staleness <= self.max_staleness
+
+    def _delay(self) -> float:
+        return max(0.0, self.interval + random.uniform(-self.jitter, self.jitter))
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                logger.exception("Cannot refresh the schedule.")
+            if self._stop.wait(self._delay()):
+                break
+
+    def start(self):
+        """Starts refreshing in a daemon thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="schedule-refresher", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Stops the background refreshes"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
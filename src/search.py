@@ -0,0 +1,105 @@
+import collections
+import threading
+
+from config import SEARCH_MIN_SCORE
+
+
+def trigrams(text) -> set:
+    """Trigrams of the words of a text, padded to match their beginnings
+
+    Args:
+        text (str): a show name or a search.
+
+    Returns:
+        set: trigrams of "Kraut" are "  k", " kr", "kra", "rau", "aut", "ut ".
+    """
+    grams = set()  # type: ignore
+    for word in text.casefold().split():
+        padded = "  %s " % word
+        grams.update(map("".join, zip(padded, padded[1:], padded[2:])))
+    return grams
+
+
+class ShowIndex:
+    """Trigram inverted index of the show names of the schedule
+
+    The index is kept up to date with update() on every new WeekSchedule. Only
+    the names that come or go are indexed or dropped, so a search costs the
+    postings of its trigrams, not a scan of the schedule.
+    """
+
+    def __init__(self, min_score=None):
+        """Constructor
+
+        Args:
+            min_score (float, optional): share of the trigrams of a search a
+                show name must have to match it.
+        """
+        self.min_score = min_score or SEARCH_MIN_SCORE
+        self.postings = collections.defaultdict(set)  # type: ignore
+        self.names = {}  # type: ignore
+        self.week = None
+        self._lock = threading.Lock()
+
+    def update(self, week) -> None:
+        """Indexes the shows of a new WeekSchedule
+
+        Args:
+            week (WeekSchedule): the latest schedule.
+        """
+        names = {show.name.casefold(): show.name for show in week.shows}
+
+        with self._lock:
+            for key in self.names.keys() - names.keys():
+                for gram in trigrams(key):
+                    self.postings[gram].discard(key)
+                    if not self.postings[gram]:
+                        del self.postings[gram]
+            for key in names.keys() - self.names.keys():
+                for gram in trigrams(key):
+                    self.postings[gram].add(key)
+            self.names = names
+            self.week = week
+
+    def search(self, text, limit=None) -> list:
+        """Show names matching a text, the best matches first
+
+        Args:
+            text (str): words of the show name, typos allowed.
+            limit (int, optional): max number of names.
+
+        Returns:
+            list: the keys (case folded names) of the matching shows.
+        """
+        grams = trigrams(text)
+        if not grams:
+            return []
+        query = " ".join(text.casefold().split())
+        with self._lock:
+            hits = collections.Counter()  # type: ignore
+            for gram in grams:
+                hits.update(self.postings.get(gram, ()))
+        matches = [
+            # Names containing the text go first, then the most similar ones.
+            (query not in key, -hits[key] / len(grams), key)
+            for key in hits
+            if hits[key] / len(grams) >= self.min_score
+        ]
+        matches.sort()
+        return [key for _, _, key in matches[:limit]]
+
+    def upcoming(self, key, when, count) -> list:
+        """The next airings of a show of the indexed schedule
+
+        Args:
+            key (str): case folded show name, as returned by search().
+            when (datetime): time to look forward from.
+            count (int): max number of airings.
+
+        Returns:
+            list: the Shows on air or starting after when, in order.
+        """
+        week = self.week
+        if week is None or key not in week.ids:
+            return []
+        return week.upcoming(week.ids[key], when, count)
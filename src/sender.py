@@ -0,0 +1,252 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+from telegram.error import RetryAfter, TelegramError
+
+from config import SEND_CHAT_BURST, SEND_CHAT_RATE, SEND_GLOBAL_RATE
+from metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+# Priorities of the messages, lower goes first.
+DIRECT = 0
+BROADCAST = 1
+
+# Seconds between the sweeps of the buckets of the chats no longer throttled.
+SWEEP_INTERVAL = 60
+
+
+class TokenBucket:
+    """Allows rate events per second, in bursts of up to capacity events."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until an event is allowed"""
+        self._refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        """Spends a token on an event"""
+        self._refill()
+        self.tokens -= 1
+
+    def full(self, now) -> bool:
+        """Whether the bucket refilled, so it's the same as a new one"""
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class Sender:
+    """Sends the telegram messages from a queue, within telegram's rate limits.
+
+    There's a global limit and one per chat, both token buckets. Direct replies
+    go before broadcasts, and a message to a throttled chat doesn't hold back
+    the messages to other chats. When telegram answers with retry_after,
+    sending is paused for that long and the message is queued again.
+    """
+
+    def __init__(
+        self,
+        bot,
+        global_rate=None,
+        chat_rate=None,
+        chat_burst=None,
+        clock=time.monotonic,
+    ):
+        """Constructor
+
+        Args:
+            bot (Bot): python-telegram-bot bot sending the messages.
+            global_rate (float, optional): messages per second to all the chats.
+            chat_rate (float, optional): messages per minute to a chat.
+            chat_burst (int, optional): messages sent at once to a chat.
+            clock (Callable, optional): returns the current time in seconds.
+        """
+        self.bot = bot
+        self.global_bucket = TokenBucket(
+            global_rate or SEND_GLOBAL_RATE, global_rate or SEND_GLOBAL_RATE, clock
+        )
+        self.chat_rate = (chat_rate or SEND_CHAT_RATE) / 60
+        self.chat_burst = chat_burst or SEND_CHAT_BURST
+        self.clock = clock
+        self.chats = {}  # type: ignore
+        self.queue = []  # type: ignore
+        self.delayed = []  # type: ignore
+        self.paused_until = 0.0
+        self.swept_at = clock()
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.latency = Histogram(
+            "keithfembot_telegram_send_seconds",
+            "Time telegram took to answer a sent message, by outcome.",
+            ("outcome",),
+        )
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+    @property
+    def depth(self) -> int:
+        """Messages waiting to be sent"""
+        return len(self.queue) + len(self.delayed)
+
+    def send(self, chat_id, priority=DIRECT, **kwargs) -> None:
+        """Queues a message
+
+        Args:
+            chat_id (int): chat to send the message to.
+            priority (int, optional): DIRECT for replies, BROADCAST otherwise.
+            **kwargs: the rest of the arguments of Bot.send_message.
+        """
+        with self._condition:
+            heapq.heappush(
+                self.queue, (priority, next(self._seq), chat_id, kwargs, self.clock())
+            )
+            self._condition.notify()
+
+    def send_many(self, chat_ids, priority=BROADCAST, **kwargs) -> None:
+        """Queues the same message to several chats at once
+
+        Args:
+            chat_ids (Iterable): chats to send the message to.
+            priority (int, optional): BROADCAST by default.
+            **kwargs: the rest of the arguments of Bot.send_message.
+        """
+        with self._condition:
+            queued_at = self.clock()
+            for chat_id in chat_ids:
+                heapq.heappush(
+                    self.queue, (priority, next(self._seq), chat_id, kwargs, queued_at)
+                )
+            self._condition.notify()
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self.chats.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst, self.clock)
+            self.chats[chat_id] = bucket
+        return bucket
+
+    def _sweep(self, now) -> None:
+        """Forgets the buckets of the chats that aren't throttled any more"""
+        self.chats = {
+            chat_id: bucket
+            for chat_id, bucket in self.chats.items()
+            if not bucket.full(now)
+        }
+        self.swept_at = now
+
+    def _next(self):
+        """Returns the next message that can be sent right away, or the seconds
+        to wait for one (None when there's nothing to send)."""
+        now = self.clock()
+        if now - self.swept_at >= SWEEP_INTERVAL:
+            self._sweep(now)
+        while self.delayed and self.delayed[0][0] <= now:
+            heapq.heappush(self.queue, heapq.heappop(self.delayed)[1:])
+
+        wait = max(self.paused_until - now, self.global_bucket.delay())
+        if wait > 0:
+            return None, wait if self.depth else None
+
+        while self.queue:
+            message = heapq.heappop(self.queue)
+            chat_bucket = self._chat_bucket(message[2])
+            chat_wait = chat_bucket.delay()
+            if chat_wait <= 0:
+                self.global_bucket.take()
+                chat_bucket.take()
+                return message, 0.0
+            heapq.heappush(self.delayed, (now + chat_wait,) + message)
+
+        return None, self.delayed[0][0] - now if self.delayed else None
+
+    def _deliver(self, message) -> None:
+        priority, seq, chat_id, kwargs, queued_at = message
+        started = self.clock()
+        try:
+            self.bot.send_message(chat_id=chat_id, **kwargs)
+        except RetryAfter as exec:
+            self.latency.observe(self.clock() - started, outcome="retry")
+            logger.warning("Flood control, retrying in %ss.", exec.retry_after)
+            with self._condition:
+                self.paused_until = self.clock() + exec.retry_after
+                self.retries += 1
+                heapq.heappush(self.queue, message)
+            return
+        except TelegramError:
+            self.latency.observe(self.clock() - started, outcome="error")
+            logger.exception("Cannot send a message to %s.", chat_id)
+            self.failed += 1
+            return
+        except Exception:
+            # Anything else is dropped too, the sender thread must keep going.
+            self.latency.observe(self.clock() - started, outcome="error")
+            logger.exception("Unexpected error sending a message to %s.", chat_id)
+            self.failed += 1
+            return
+
+        finished = self.clock()
+        self.latency.observe(finished - started, outcome="ok")
+        waited = finished - queued_at
+        self.sent += 1
+        self.wait_total += waited
+        self.wait_max = max(self.wait_max, waited)
+
+    def process(self):
+        """Sends the next message if the limits allow it
+
+        Returns:
+            float: seconds to wait for the next message, None if there's none.
+        """
+        with self._condition:
+            message, wait = self._next()
+        if message is None:
+            return wait
+        self._deliver(message)
+        return 0.0
+
+    def _run(self) -> None:
+        with self._condition:
+            while not self._stop:
+                message, wait = self._next()
+                if message is None:
+                    self._condition.wait(wait)
+                    continue
+                self._condition.release()
+                try:
+                    self._deliver(message)
+                finally:
+                    self._condition.acquire()
+
+    def start(self) -> None:
+        """Sends the queued messages from a background thread"""
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="sender", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops sending. The messages still queued are discarded."""
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,198 @@
+import logging
+import sqlite3
+import threading
+
+from config import STORE_BATCH_SIZE, STORE_FLUSH_INTERVAL, STORE_PATH
+from migrations import migrate
+
+logger = logging.getLogger(__name__)
+
+# The show of the chats subscribed to every show.
+EVERY_SHOW = "all"
+
+# Statements are parametrized constants, so sqlite3 prepares each one once and
+# keeps it in the statement cache of the connection.
+SUBSCRIBE = "INSERT OR IGNORE INTO subscriptions (chat_id, show) VALUES (?, ?)"
+UNSUBSCRIBE = "DELETE FROM subscriptions WHERE chat_id = ? AND show = ?"
+UNSUBSCRIBE_ALL = "DELETE FROM subscriptions WHERE chat_id = ?"
+IS_SUBSCRIBED = "SELECT 1 FROM subscriptions WHERE chat_id = ? AND show = ?"
+HAS_SUBSCRIPTIONS = "SELECT 1 FROM subscriptions WHERE chat_id = ?"
+CHATS_FOR = "SELECT DISTINCT chat_id FROM subscriptions WHERE show IN (?, ?)"
+SHOWS_FOR = "SELECT show FROM subscriptions WHERE chat_id = ? ORDER BY show"
+CHAT_SETTINGS = "SELECT timezone, language FROM chat_settings WHERE chat_id = ?"
+SET_CHAT_SETTINGS = (
+    "INSERT INTO chat_settings (chat_id, timezone, language) VALUES (?, ?, ?) "
+    "ON CONFLICT (chat_id) DO UPDATE SET "
+    "timezone = excluded.timezone, language = excluded.language"
+)
+
+
+class Store:
+    """SQLite store of the subscriptions and the chat settings
+
+    Writes are queued and committed in batches, in one transaction. Reads are
+    served from memory, a show start costs one indexed query the first time.
+    The memory is dropped when another process commits to the same database.
+    """
+
+    def __init__(self, path=None, batch_size=None, flush_interval=None):
+        """Constructor
+
+        Args:
+            path (str, optional): database file, ":memory:" for a throwaway one.
+            batch_size (int, optional): queued writes that trigger a flush.
+            flush_interval (float, optional): seconds between background flushes.
+        """
+        self.path = path or STORE_PATH
+        self.batch_size = batch_size or STORE_BATCH_SIZE
+        self.flush_interval = flush_interval or STORE_FLUSH_INTERVAL
+        self.connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.version = migrate(self.connection)
+        self.pending = []  # type: ignore
+        self.flushes = 0
+        self._chats = {}  # type: ignore
+        self._settings = {}  # type: ignore
+        self._data_version = None
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _write(self, statement, parameters) -> None:
+        self.pending.append((statement, parameters))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Commits the queued writes in one transaction"""
+        with self._lock:
+            if not self.pending:
+                return
+            pending, self.pending = self.pending, []
+            try:
+                with self.connection:
+                    self.connection.execute("BEGIN")
+                    for statement, parameters in pending:
+                        self.connection.execute(statement, parameters)
+            except sqlite3.Error:
+                logger.exception("Cannot write %d changes.", len(pending))
+                self.pending = pending + self.pending
+                raise
+            self.flushes += 1
+
+    def _query(self, statement, parameters) -> list:
+        # Pending writes go first, so reads see them.
+        self.flush()
+        return self.connection.execute(statement, parameters).fetchall()
+
+    def subscribe(self, chat_id, show) -> None:
+        """Subscribes a chat to a show"""
+        with self._lock:
+            self._write(SUBSCRIBE, (chat_id, show))
+            self._forget(show)
+
+    def unsubscribe(self, chat_id, show=None) -> bool:
+        """Unsubscribes a chat from a show, or from every show if None
+
+        Returns:
+            bool: whether the chat was subscribed.
+        """
+        with self._lock:
+            if show is None:
+                subscribed = bool(self._query(HAS_SUBSCRIPTIONS, (chat_id,)))
+                self._write(UNSUBSCRIBE_ALL, (chat_id,))
+                self._chats.clear()
+            else:
+                subscribed = bool(self._query(IS_SUBSCRIBED, (chat_id, show)))
+                self._write(UNSUBSCRIBE, (chat_id, show))
+                self._forget(show)
+            return subscribed
+
+    def _check_data_version(self) -> None:
+        # data_version only changes with the commits of other connections.
+        (data_version,) = self.connection.execute("PRAGMA data_version").fetchone()
+        if data_version != self._data_version:
+            self._chats.clear()
+            self._settings.clear()
+            self._data_version = data_version
+
+    def _forget(self, show) -> None:
+        if show == EVERY_SHOW:
+            self._chats.clear()
+        else:
+            self._chats.pop(show, None)
+
+    def chats_for(self, show) -> frozenset:
+        """The chats subscribed to a show or to every show
+
+        Args:
+            show (str): show name, as subscribed.
+
+        Returns:
+            frozenset: the chat ids.
+        """
+        with self._lock:
+            self._check_data_version()
+            chats = self._chats.get(show)
+            if chats is None:
+                rows = self._query(CHATS_FOR, (show, EVERY_SHOW))
+                chats = self._chats[show] = frozenset(row[0] for row in rows)
+            return chats
+
+    def shows_for(self, chat_id) -> list:
+        """The shows a chat is subscribed to"""
+        with self._lock:
+            return [row[0] for row in self._query(SHOWS_FOR, (chat_id,))]
+
+    def chat_settings(self, chat_id) -> dict:
+        """The timezone and language of a chat, None when they aren't set"""
+        with self._lock:
+            self._check_data_version()
+            settings = self._settings.get(chat_id)
+            if settings is None:
+                rows = self._query(CHAT_SETTINGS, (chat_id,))
+                timezone, language = rows[0] if rows else (None, None)
+                settings = self._settings[chat_id] = {
+                    "timezone": timezone,
+                    "language": language,
+                }
+            return dict(settings)
+
+    def set_chat_settings(self, chat_id, **settings) -> None:
+        """Updates the timezone and/or the language of a chat"""
+        with self._lock:
+            settings = {**self.chat_settings(chat_id), **settings}
+            self._write(
+                SET_CHAT_SETTINGS,
+                (chat_id, settings["timezone"], settings["language"]),
+            )
+            self._settings[chat_id] = settings
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error:
+                pass
+
+    def start(self) -> None:
+        """Flushes the queued writes from a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="store", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the background flushes and commits the queued writes"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def close(self) -> None:
+        """Commits the queued writes and closes the database"""
+        self.stop()
+        self.connection.close()
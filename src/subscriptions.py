@@ -0,0 +1,172 @@
+import heapq
+import itertools
+import logging
+import threading
+
+from telegram import ParseMode
+
+from formatting import on_air
+from models import now
+from sender import BROADCAST
+from store import EVERY_SHOW, Store
+
+logger = logging.getLogger(__name__)
+
+
+class Subscriptions:
+    """The chats to notify when a show starts, by show name."""
+
+    def __init__(self, store=None):
+        """Constructor
+
+        Args:
+            store (Store, optional): where the subscriptions are kept. In memory
+                by default, so they are lost on restart.
+        """
+        self.store = store or Store(":memory:")
+
+    def add(self, chat_id, name=EVERY_SHOW) -> None:
+        """Subscribes a chat to a show, or to every show with "all"
+
+        Args:
+            chat_id (int): chat to notify.
+            name (str, optional): show name, matched ignoring the case.
+        """
+        self.store.subscribe(chat_id, name.casefold())
+
+    def remove(self, chat_id, name=None) -> bool:
+        """Unsubscribes a chat from a show, from "all", or from everything
+
+        Args:
+            chat_id (int): chat to stop notifying.
+            name (str, optional): show name. Removes every subscription if None.
+
+        Returns:
+            bool: whether the chat was subscribed.
+        """
+        return self.store.unsubscribe(chat_id, name and name.casefold())
+
+    def shows_for(self, chat_id) -> list:
+        """The case folded names of the shows a chat is subscribed to"""
+        return self.store.shows_for(chat_id)
+
+    def chats_for(self, name) -> frozenset:
+        """The chats subscribed to a show, or to every show"""
+        return self.store.chats_for(name.casefold())
+
+
+class Notifier:
+    """Notifies the subscribed chats when a show starts
+
+    The upcoming starts of the latest WeekSchedule are kept in a heap, so the
+    background thread sleeps until the next start instead of polling the
+    subscribers. The messages of a start are queued at once to the sender.
+    """
+
+    # Upper bound of a wait, in case the wall clock jumps.
+    MAX_WAIT = 60
+
+    def __init__(self, subscriptions, sender, clock=now):
+        """Constructor
+
+        Args:
+            subscriptions (Subscriptions): chats to notify.
+            sender (Sender): rate limited sender queueing the notifications.
+            clock (Callable, optional): returns the current aware datetime.
+        """
+        self.subscriptions = subscriptions
+        self.sender = sender
+        self.clock = clock
+        self.since = clock()
+        self.heap = []  # type: ignore
+        self.notified = 0
+        self._seq = itertools.count()
+        self._condition = threading.Condition()
+        self._stop = False
+        self._thread = None
+
+    def schedule(self, week) -> None:
+        """Replaces the upcoming starts with the ones of a new WeekSchedule
+
+        Args:
+            week (WeekSchedule): the latest schedule.
+        """
+        heap = [
+            (show.starts, next(self._seq), show)
+            for show in week.shows
+            if show.starts > self.since
+        ]
+        heapq.heapify(heap)
+        with self._condition:
+            self.heap = heap
+            self._condition.notify()
+
+    def _due(self):
+        """Pops the next show if it already started
+
+        Returns:
+            tuple: the show or None, and the seconds to its start or None.
+        """
+        if not self.heap:
+            return None, None
+        wait = (self.heap[0][0] - self.clock()).total_seconds()
+        if wait > 0:
+            return None, wait
+        starts, _, show = heapq.heappop(self.heap)
+        self.since = max(self.since, starts)
+        return show, 0.0
+
+    def _notify(self, show) -> None:
+        chat_ids = self.subscriptions.chats_for(show.name)
+        if not chat_ids:
+            return
+        self.sender.send_many(
+            sorted(chat_ids),
+            priority=BROADCAST,
+            text="📻 Starting now: " + on_air(show),
+            parse_mode=ParseMode.MARKDOWN,
+        )
+        self.notified += len(chat_ids)
+
+    def process(self):
+        """Notifies the next show if it already started
+
+        Returns:
+            float: seconds to the next start, None if there's none.
+        """
+        with self._condition:
+            show, wait = self._due()
+        if show is None:
+            return wait
+        self._notify(show)
+        return 0.0
+
+    def _run(self) -> None:
+        with self._condition:
+            while not self._stop:
+                show, wait = self._due()
+                if show is None:
+                    self._condition.wait(min(wait or self.MAX_WAIT, self.MAX_WAIT))
+                    continue
+                self._condition.release()
+                try:
+                    self._notify(show)
+                except Exception:
+                    logger.exception("Cannot notify %s.", show.name)
+                finally:
+                    self._condition.acquire()
+
+    def start(self) -> None:
+        """Notifies the starts from a background thread"""
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops notifying"""
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
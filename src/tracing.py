@@ -0,0 +1,293 @@
+import contextlib
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import requests
+
+from config import (
+    TRACING_EXPORTER,
+    TRACING_FILE,
+    TRACING_OTLP_ENDPOINT,
+    TRACING_SERVICE_NAME,
+)
+
+logger = logging.getLogger(__name__)
+
+# Returned by span() while tracing is disabled, so it costs one attribute lookup.
+NO_SPAN = contextlib.nullcontext()
+
+
+class Span:
+    """A timed operation of a trace, like a command or the request to airtime"""
+
+    __slots__ = (
+        "name",
+        "trace_id",
+        "span_id",
+        "parent_id",
+        "start",
+        "end",
+        "attributes",
+    )
+
+    def __init__(self, name, trace_id, parent_id, attributes):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start = time.time_ns()
+        self.end = None
+        self.attributes = attributes
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start": self.start,
+            "duration_ms": (self.end - self.start) / 1e6,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """Opens the spans of the running thread and hands the ended ones to an exporter
+
+    Without an exporter, the default, tracing is disabled.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+        self._local = threading.local()
+
+    @contextlib.contextmanager
+    def _span(self, name, attributes):
+        parent = getattr(self._local, "span", None)
+        if parent is None:
+            span = Span(name, os.urandom(16).hex(), None, attributes)
+        else:
+            span = Span(name, parent.trace_id, parent.span_id, attributes)
+        self._local.span = span
+        try:
+            yield span
+        except Exception as exc:
+            span.attributes["error"] = type(exc).__name__
+            raise
+        finally:
+            span.end = time.time_ns()
+            self._local.span = parent
+            try:
+                self.exporter.export(span)  # type: ignore
+            except Exception:
+                logger.exception("Cannot export the span %s.", name)
+
+    def span(self, name, **attributes):
+        """A span around a block, child of the span open in the thread
+
+        Args:
+            name (str): what is timed, like "http.get".
+            **attributes: what identifies it, like the url.
+        """
+        if self.exporter is None:
+            return NO_SPAN
+        return self._span(name, attributes)
+
+    def traced(self, name, command):
+        """Wraps a command handler in a span with the update and chat ids
+
+        Args:
+            name (str): the name of the command, like "now".
+            command (Callable): the handler.
+
+        Returns:
+            Callable: the handler, traced.
+        """
+
+        def traced(update, context):
+            if self.exporter is None:
+                return command(update, context)
+            chat = getattr(update, "effective_chat", None)
+            with self._span(
+                "command",
+                {
+                    "command": name,
+                    "update_id": getattr(update, "update_id", None),
+                    "chat_id": getattr(chat, "id", None),
+                },
+            ):
+                return command(update, context)
+
+        return traced
+
+    def close(self) -> None:
+        """Flushes the exporter"""
+        if self.exporter is not None:
+            self.exporter.close()
+
+
+class JSONExporter:
+    """Writes every span as a line of JSON, to stdout or to a file"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def export(self, span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+    def close(self) -> None:
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+
+def _value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPExporter:
+    """Sends the spans in batches to an OpenTelemetry collector, as OTLP/HTTP JSON"""
+
+    def __init__(
+        self,
+        endpoint=None,
+        service_name=None,
+        interval=5.0,
+        max_batch=512,
+        http_client=None,
+    ):
+        """Constructor
+
+        Args:
+            endpoint (str, optional): the traces url of the collector, like
+                http://127.0.0.1:4318/v1/traces.
+            service_name (str, optional): service.name of the spans.
+            interval (float, optional): seconds between the batches.
+            max_batch (int, optional): spans that trigger a batch before time.
+            http_client (requests.Session, optional): posts the batches.
+        """
+        self.endpoint = endpoint or TRACING_OTLP_ENDPOINT
+        self.service_name = service_name or TRACING_SERVICE_NAME
+        self.interval = interval
+        self.max_batch = max_batch
+        self.http_client = http_client or requests.Session()
+        self.spans = []  # type: ignore
+        self.dropped = 0
+        self._condition = threading.Condition()
+        self._stop = False
+        self._thread = threading.Thread(target=self._run, name="otlp", daemon=True)
+        self._thread.start()
+
+    def export(self, span) -> None:
+        with self._condition:
+            self.spans.append(span)
+            if len(self.spans) >= self.max_batch:
+                self._condition.notify()
+
+    def payload(self, spans) -> dict:
+        """The OTLP JSON request of a batch of spans"""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": self.service_name},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "keithfembot"},
+                            "spans": [
+                                {
+                                    "traceId": span.trace_id,
+                                    "spanId": span.span_id,
+                                    "parentSpanId": span.parent_id or "",
+                                    "name": span.name,
+                                    "kind": 1,
+                                    "startTimeUnixNano": str(span.start),
+                                    "endTimeUnixNano": str(span.end),
+                                    "attributes": [
+                                        {"key": key, "value": _value(value)}
+                                        for key, value in span.attributes.items()
+                                        if value is not None
+                                    ],
+                                }
+                                for span in spans
+                            ],
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def flush(self) -> None:
+        """Sends the spans exported so far"""
+        with self._condition:
+            spans, self.spans = self.spans, []
+        if not spans:
+            return
+        try:
+            response = self.http_client.post(
+                self.endpoint, json=self.payload(spans), timeout=5
+            )
+            response.raise_for_status()
+        except requests.RequestException:
+            # Tracing never takes the bot down, the batch is dropped.
+            logger.warning("Cannot send %d spans to %s.", len(spans), self.endpoint)
+            self.dropped += len(spans)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                if not self._stop and len(self.spans) < self.max_batch:
+                    self._condition.wait(self.interval)
+                stop = self._stop
+            self.flush()
+            if stop:
+                return
+
+    def close(self) -> None:
+        """Sends the last spans and stops"""
+        with self._condition:
+            self._stop = True
+            self._condition.notify()
+        self._thread.join()
+
+
+def exporter(name=None):
+    """The exporter configured in TRACING_EXPORTER, None to disable tracing
+
+    Args:
+        name (str, optional): "none", "stdout", "file" (JSON lines in
+            TRACING_FILE) or "otlp" (to TRACING_OTLP_ENDPOINT).
+    """
+    name = (name or TRACING_EXPORTER).lower()
+    if name == "stdout":
+        return JSONExporter()
+    if name == "file":
+        return JSONExporter(open(TRACING_FILE, "a"))
+    if name == "otlp":
+        return OTLPExporter()
+    if name != "none":
+        raise ValueError("Unknown tracing exporter %r." % name)
+    return None
+
+
+tracer = Tracer()
+span = tracer.span
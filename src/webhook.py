@@ -0,0 +1,92 @@
+import hmac
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telegram import Update
+
+from config import WEBHOOK_LISTEN, WEBHOOK_PATH, WEBHOOK_PORT
+
+logger = logging.getLogger(__name__)
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Receives the updates telegram POSTs to the webhook"""
+
+    server: "WebhookServer"
+
+    def _reply(self, status) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self) -> None:
+        if self.path != self.server.path:
+            return self._reply(404)
+
+        token = self.headers.get(SECRET_TOKEN_HEADER, "").encode()
+        if not hmac.compare_digest(token, self.server.secret_token.encode()):
+            return self._reply(403)
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length))
+            update = Update.de_json(data, self.server.dispatcher.bot)
+        except (ValueError, TypeError, KeyError):
+            logger.warning("Invalid update received on the webhook.")
+            return self._reply(400)
+
+        self.server.dispatcher.update_queue.put(update)
+        return self._reply(200)
+
+    def log_message(self, format, *args) -> None:
+        logger.debug(format, *args)
+
+
+class WebhookServer(ThreadingHTTPServer):
+    """Lightweight HTTP server for the telegram webhook.
+
+    It only validates the secret token and queues the updates in the
+    dispatcher, so it can sit behind a local reverse proxy and several bot
+    processes can share the load.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, dispatcher, secret_token, listen=None, port=None, path=None):
+        """Constructor
+
+        Args:
+            dispatcher (Dispatcher): python-telegram-bot dispatcher with the
+                command handlers.
+            secret_token (str): token telegram sends on every update.
+            listen (str, optional): address to listen to.
+            port (int, optional): port to listen to. 0 picks a free one.
+            path (str, optional): url path telegram POSTs the updates to.
+        """
+        if not secret_token:
+            raise ValueError("A secret token is required for the webhook.")
+
+        self.dispatcher = dispatcher
+        self.secret_token = secret_token
+        self.path = path or WEBHOOK_PATH
+        self._thread = None
+        super().__init__(
+            (listen or WEBHOOK_LISTEN, WEBHOOK_PORT if port is None else port),
+            WebhookHandler,
+        )
+
+    def start(self) -> None:
+        """Serves the webhook in a background thread"""
+        self._thread = threading.Thread(
+            target=self.serve_forever, name="webhook", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops serving and releases the socket"""
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from clients.async_http import AsyncHTTPClient
+from clients.fakes.async_http import FakeAsyncHTTPClient
+from config import DADJOKE_URL
+from exceptions import HTTPError
+
+
+class SlowHTTPClient:
+    """Blocking client tracking how many requests run at the same time."""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def get(self, url, headers=None):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        return "body of %s" % url
+
+    def close(self):
+        pass
+
+
+class TestAsyncHTTPClient:
+    def test_get(self):
+        client = AsyncHTTPClient(SlowHTTPClient(delay=0))
+
+        text = asyncio.run(client.get("https://airtime.pro/live-info"))
+
+        assert text == "body of https://airtime.pro/live-info"
+
+    def test_get_throws_exception(self):
+        class FailingHTTPClient(SlowHTTPClient):
+            def get(self, url, headers=None):
+                raise HTTPError("Connection Error")
+
+        client = AsyncHTTPClient(FailingHTTPClient())
+
+        with pytest.raises(HTTPError) as exc_info:
+            asyncio.run(client.get("https://airtime.pro/live-info"))
+
+        assert "Connection Error" in str(exc_info.value)
+
+    def test_get_total_timeout(self):
+        client = AsyncHTTPClient(SlowHTTPClient(delay=0.2), total_timeout=0.01)
+
+        with pytest.raises(HTTPError) as exc_info:
+            asyncio.run(client.get("https://airtime.pro/live-info"))
+
+        assert "Timeout" in str(exc_info.value)
+
+    def test_limit_per_host(self):
+        upstream = SlowHTTPClient()
+        client = AsyncHTTPClient(upstream, limit_per_host=2)
+
+        async def burst():
+            return await asyncio.gather(
+                *[client.get("https://airtime.pro/week-info") for _ in range(6)]
+            )
+
+        assert len(asyncio.run(burst())) == 6
+        assert upstream.max_running == 2
+
+    def test_cancellation_frees_the_slot(self):
+        client = AsyncHTTPClient(SlowHTTPClient(delay=0.1), limit_per_host=1)
+
+        async def cancel_and_retry():
+            task = asyncio.create_task(client.get("https://airtime.pro/live-info"))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return await client.get("https://airtime.pro/live-info")
+
+        assert asyncio.run(cancel_and_retry()) == (
+            "body of https://airtime.pro/live-info"
+        )
+
+
+class TestFakeAsyncHTTPClient:
+    def test_joke(self, joke):
+        client = FakeAsyncHTTPClient()
+        headers = {"User-Agent": "Keith F'em Bot", "Accept": "text/plain"}
+
+        assert asyncio.run(client.get(DADJOKE_URL, headers)) == joke
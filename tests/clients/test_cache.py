@@ -0,0 +1,212 @@
+import threading
+
+import pytest
+from freezegun import freeze_time
+
+from clients.cache import CachedHTTPClient, ShowBoundaryTTL
+from exceptions import HTTPError
+
+LIVE_INFO = "https://airtime.pro/live-info"
+WEEK_INFO = "https://airtime.pro/week-info"
+
+
+class CountingHTTPClient:
+    """Answers with the url and the number of calls made so far."""
+
+    def __init__(self, wait=None):
+        self.calls = 0
+        self.wait = wait
+
+    def get(self, url, headers=None):
+        self.calls += 1
+        if self.wait is not None:
+            self.wait.wait(timeout=1)
+        return "%s #%d" % (url, self.calls)
+
+
+class TestCachedHTTPClient:
+    def test_get_is_cached_until_ttl(self, clock):
+        upstream = CountingHTTPClient()
+        client = CachedHTTPClient(
+            upstream, ttls={LIVE_INFO: 10}, max_stale=0, clock=clock
+        )
+
+        assert client.get(LIVE_INFO) == LIVE_INFO + " #1"
+        clock.now = 9
+        assert client.get(LIVE_INFO) == LIVE_INFO + " #1"
+        clock.now = 10
+        assert client.get(LIVE_INFO) == LIVE_INFO + " #2"
+        assert upstream.calls == 2
+
+    def test_get_ttl_per_url(self, clock):
+        upstream = CountingHTTPClient()
+        client = CachedHTTPClient(
+            upstream, ttls={LIVE_INFO: 10, WEEK_INFO: 100}, max_stale=0, clock=clock
+        )
+
+        client.get(LIVE_INFO)
+        client.get(WEEK_INFO)
+        clock.now = 50
+        client.get(LIVE_INFO)
+        client.get(WEEK_INFO)
+
+        assert upstream.calls == 3
+
+    def test_get_without_ttl_is_not_cached(self):
+        upstream = CountingHTTPClient()
+        client = CachedHTTPClient(upstream, ttls={LIVE_INFO: 10})
+
+        client.get("https://icanhazdadjoke.com/")
+        client.get("https://icanhazdadjoke.com/")
+
+        assert upstream.calls == 2
+
+    def test_get_errors_are_not_cached(self):
+        class FailingHTTPClient:
+            def get(self, url, headers=None):
+                raise HTTPError("Airtime is down")
+
+        client = CachedHTTPClient(FailingHTTPClient(), ttls={LIVE_INFO: 10})
+
+        with pytest.raises(HTTPError):
+            client.get(LIVE_INFO)
+        assert client.entries == {}
+
+    def test_concurrent_misses_collapse(self):
+        release = threading.Event()
+        upstream = CountingHTTPClient(wait=release)
+        client = CachedHTTPClient(upstream, ttls={LIVE_INFO: 10})
+        results = []
+
+        threads = [
+            threading.Thread(target=lambda: results.append(client.get(LIVE_INFO)))
+            for _ in range(10)
+        ]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert upstream.calls == 1
+        assert results == [LIVE_INFO + " #1"] * 10
+
+    def test_invalidate(self):
+        upstream = CountingHTTPClient()
+        client = CachedHTTPClient(upstream, ttls={LIVE_INFO: 10})
+
+        client.get(LIVE_INFO)
+        client.invalidate(LIVE_INFO)
+        client.get(LIVE_INFO)
+
+        assert upstream.calls == 2
+
+
+class TestCachedHTTPClientStale:
+    def test_stale_while_revalidate(self, clock):
+        revalidations = []
+        upstream = CountingHTTPClient()
+        client = CachedHTTPClient(
+            upstream,
+            ttls={LIVE_INFO: 10},
+            max_stale=60,
+            clock=clock,
+            spawn=revalidations.append,
+        )
+
+        client.get(LIVE_INFO)
+        clock.now = 20
+        assert client.get(LIVE_INFO) == LIVE_INFO + " #1"
+        assert client.get(LIVE_INFO) == LIVE_INFO + " #1"
+        assert len(revalidations) == 1  # only one revalidation at a time
+
+        revalidations[0]()
+        assert client.get(LIVE_INFO) == LIVE_INFO + " #2"
+        assert upstream.calls == 2
+        assert (client.hits, client.stale, client.misses) == (1, 2, 1)
+        assert client.hit_ratio() == 0.75
+
+    def test_too_stale_is_fetched(self, clock):
+        upstream = CountingHTTPClient()
+        client = CachedHTTPClient(
+            upstream, ttls={LIVE_INFO: 10}, max_stale=60, clock=clock
+        )
+
+        client.get(LIVE_INFO)
+        clock.now = 61
+        assert client.get(LIVE_INFO) == LIVE_INFO + " #2"
+
+    def test_stale_on_error(self, clock):
+        upstream = CountingHTTPClient()
+        client = CachedHTTPClient(
+            upstream,
+            ttls={LIVE_INFO: 10},
+            max_stale=600,
+            clock=clock,
+            spawn=lambda revalidate: revalidate(),
+        )
+        client.get(LIVE_INFO)
+        assert client.stale_for(LIVE_INFO) is None
+
+        def fail(url, headers=None):
+            raise HTTPError("Airtime is down")
+
+        upstream.get = fail  # type: ignore
+        clock.now = 300
+        assert client.get(LIVE_INFO) == LIVE_INFO + " #1"
+        assert client.stale_for(LIVE_INFO) == 300
+
+        clock.now = 601
+        with pytest.raises(HTTPError):
+            client.get(LIVE_INFO)
+
+
+class TestShowBoundaryTTL:
+    @freeze_time("2020-12-27 21:36:16")
+    def test_expires_when_current_show_ends(self, response_live_info):
+        ttl = ShowBoundaryTTL(max_ttl=3600, margin=5)
+
+        assert ttl(response_live_info) == 23 * 60 + 44 + 5
+
+    @freeze_time("2020-12-27 21:36:16")
+    def test_is_capped_by_max_ttl(self, response_live_info):
+        ttl = ShowBoundaryTTL(max_ttl=60, margin=5)
+
+        assert ttl(response_live_info) == 60
+
+    @freeze_time("2023-01-18 14:00:00")
+    def test_expires_when_next_show_starts(self, response_live_info_with_empty_shows):
+        ttl = ShowBoundaryTTL(max_ttl=7200, margin=0)
+
+        assert ttl(response_live_info_with_empty_shows) == 3600
+
+    @freeze_time("2021-01-01")
+    def test_falls_back_without_upcoming_boundaries(self, response_live_info):
+        ttl = ShowBoundaryTTL(fallback_ttl=30)
+
+        assert ttl(response_live_info) == 30
+        assert ttl("not json") == 30
+
+    @freeze_time("2020-12-27 21:36:16")
+    def test_cached_client_uses_boundary(self, response_live_info, clock):
+        class LiveInfoClient(CountingHTTPClient):
+            def get(self, url, headers=None):
+                super().get(url, headers)
+                return response_live_info
+
+        upstream = LiveInfoClient()
+        client = CachedHTTPClient(
+            upstream,
+            ttls={LIVE_INFO: ShowBoundaryTTL(margin=0)},
+            max_stale=0,
+            clock=clock,
+        )
+
+        client.get(LIVE_INFO)
+        clock.now = 23 * 60 + 43
+        client.get(LIVE_INFO)
+        assert upstream.calls == 1
+
+        clock.now = 23 * 60 + 44
+        client.get(LIVE_INFO)
+        assert upstream.calls == 2
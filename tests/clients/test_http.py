@@ -1,5 +1,5 @@
 from unittest import TestCase
-from unittest.mock import patch
+from unittest.mock import ANY, patch
 
 import pytest
 import requests
@@ -8,25 +8,114 @@ from clients.http import HTTPClient
 from exceptions import HTTPError
 
 
+def response(status_code=200, content=b"", headers=None):
+    """Builds a requests response"""
+    response = requests.Response()
+    response.status_code = status_code
+    response.encoding = "utf-8"
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
 class HTTPClientTest(TestCase):
     def test_get(self):
-        http_client = HTTPClient()
+        http_client = HTTPClient(connect_timeout=1, read_timeout=2)
         url = "https://www.google.com"
         headers = {"Accept": "text/plain"}
 
-        with patch("requests.get") as patched_get:
+        with patch("requests.Session.get") as patched_get:
+            patched_get.return_value = response()
             http_client.get(url, headers)
-            patched_get.assert_called_once_with(url=url, headers=headers)
+            patched_get.assert_called_once_with(
+                url=url, headers=headers, timeout=(1, 2)
+            )
 
     def test_get_throws_exception(self):
         http_client = HTTPClient()
         url = "https://www.google.com"
         headers = {"Accept": "text/plain"}
 
-        with patch("requests.get") as patched_get:
+        with patch("requests.Session.get") as patched_get:
             patched_get.side_effect = requests.exceptions.ConnectionError()
             with pytest.raises(HTTPError) as exc_info:
                 http_client.get(url, headers)
                 assert "Connection Error" in exc_info.value
 
-            patched_get.assert_called_once_with(url=url, headers=headers)
+            patched_get.assert_called_once()
+
+    def test_get_reuses_session_per_host(self):
+        http_client = HTTPClient()
+
+        with patch("requests.Session.get", return_value=response()):
+            http_client.get("https://airtime.pro/live-info")
+            http_client.get("https://airtime.pro/week-info")
+            http_client.get("https://icanhazdadjoke.com/")
+
+        assert set(http_client.sessions) == {"airtime.pro", "icanhazdadjoke.com"}
+
+    def test_get_without_keep_alive(self):
+        http_client = HTTPClient(keep_alive=False)
+
+        with patch("requests.Session.get", return_value=response()):
+            http_client.get("https://airtime.pro/live-info")
+
+        session = http_client.sessions["airtime.pro"]
+        assert session.headers["Connection"] == "close"
+
+    def test_close(self):
+        http_client = HTTPClient()
+
+        with patch("requests.Session.get", return_value=response()):
+            http_client.get("https://airtime.pro/live-info")
+
+        with patch("requests.Session.close") as patched_close:
+            http_client.close()
+            patched_close.assert_called_once()
+
+        assert http_client.sessions == {}
+
+    def test_get_not_modified(self):
+        http_client = HTTPClient()
+        url = "https://airtime.pro/week-info"
+
+        with patch("requests.Session.get") as patched_get:
+            patched_get.return_value = response(
+                content=b'{"monday": []}',
+                headers={"ETag": '"v1"', "Last-Modified": "Mon, 28 Dec 2020"},
+            )
+            first = http_client.get(url)
+
+            patched_get.return_value = response(status_code=304)
+            second = http_client.get(url, {"Accept": "application/json"})
+
+            patched_get.assert_called_with(
+                url=url,
+                headers={
+                    "Accept": "application/json",
+                    "If-None-Match": '"v1"',
+                    "If-Modified-Since": "Mon, 28 Dec 2020",
+                },
+                timeout=http_client.timeout,
+            )
+
+        assert first == '{"monday": []}'
+        assert second is first
+        assert http_client.version(url) == '"v1"'
+
+    def test_get_same_body_without_validators(self):
+        http_client = HTTPClient()
+        url = "https://airtime.pro/week-info"
+
+        with patch("requests.Session.get") as patched_get:
+            patched_get.return_value = response(content=b'{"monday": []}')
+            first = http_client.get(url)
+            second = http_client.get(url)
+            patched_get.assert_called_with(url=url, headers=None, timeout=ANY)
+
+            patched_get.return_value = response(content=b'{"tuesday": []}')
+            third = http_client.get(url)
+
+        assert second is first
+        assert third == '{"tuesday": []}'
+        assert http_client.version(url) is not None
@@ -0,0 +1,95 @@
+import threading
+import time
+
+import pytest
+
+from clients.singleflight import SingleFlight, SingleFlightHTTPClient
+from exceptions import HTTPError
+
+
+def burst(function, callers=10):
+    """Calls function from several threads at once, returns results and errors."""
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(function())
+        except Exception as exec:
+            errors.append(exec)
+
+    threads = [threading.Thread(target=call) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    return threads, results, errors
+
+
+class TestSingleFlight:
+    def test_concurrent_calls_share_result(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            release.wait(timeout=1)
+            return "live-info"
+
+        threads, results, errors = burst(lambda: flight.do("live-info", fetch))
+        while flight.calls < 10:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == ["live-info"] * 10
+        assert flight.coalesced == 9
+
+    def test_concurrent_calls_share_exception(self):
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def fetch():
+            release.wait(timeout=1)
+            raise HTTPError("Airtime is down")
+
+        threads, results, errors = burst(lambda: flight.do("live-info", fetch))
+        while flight.calls < 10:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert results == []
+        assert len(errors) == 10
+        assert len({id(error) for error in errors}) == 1
+
+    def test_sequential_calls_are_not_coalesced(self):
+        flight = SingleFlight()
+
+        assert flight.do("key", lambda: 1) == 1
+        assert flight.do("key", lambda: 2) == 2
+        assert flight.coalesced == 0
+
+        def fail():
+            raise HTTPError("Airtime is down")
+
+        with pytest.raises(HTTPError):
+            flight.do("key", fail)
+        assert flight.do("key", lambda: 3) == 3
+
+
+class TestSingleFlightHTTPClient:
+    def test_key_includes_headers(self):
+        class EchoHTTPClient:
+            def get(self, url, headers=None):
+                return (url, headers)
+
+        client = SingleFlightHTTPClient(EchoHTTPClient())
+
+        assert client.get("/joke", {"Accept": "text/plain"}) == (
+            "/joke",
+            {"Accept": "text/plain"},
+        )
+        assert client.get("/joke") == ("/joke", None)
+        assert client.flight.calls == 2
@@ -4,6 +4,48 @@ from urllib import request
 import pytest
 
 from clients.http import HTTPClient
+from exceptions import HTTPError
+
+
+class Clock:
+    """A clock that only moves when told to, by setting now."""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class AirtimeHTTPClient:
+    """Serves week-info and live-info, counting the requests. A response set to
+    None fails like airtime being down."""
+
+    def __init__(self, week_info, live_info=None):
+        self.responses = {"week-info": week_info, "live-info": live_info}
+        self.calls = 0
+
+    def get(self, url, headers=None):
+        self.calls += 1
+        response = self.responses[url.rsplit("/", 1)[-1]]
+        if response is None:
+            raise HTTPError("Airtime is down")
+        return response
+
+    def close(self):
+        """Nothing to release"""
+
+
+@pytest.fixture
+def clock():
+    """A settable clock, at 0 until clock.now is changed."""
+    return Clock()
+
+
+@pytest.fixture
+def airtime():
+    """The fake airtime client, built with the week-info and live-info texts."""
+    return AirtimeHTTPClient
 
 
 @pytest.fixture
@@ -45,6 +87,10 @@ def help():
         "`/today`: displays the schedule for today.\n"
         "`/tomorrow`: displays the schedule for tomorrow.\n"
         "`/week`: displays the shows for the week.\n"
+        "`/show <name>`: displays the next airings of a show.\n"
+        "`/search <text>`: when are the shows matching the text on.\n"
+        "`/subscribe <show>`: get a message when the show starts, or any with `all`.\n"
+        "`/unsubscribe [show]`: stop the messages of a show, or all of them.\n"
         "`/joke`: KeithF'em BotMeister, tell me a joke.\n"
         "`/donate`: donate to Keith F'em.\n"
         "`/help`: this help.\n"
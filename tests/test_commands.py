@@ -1,11 +1,14 @@
 import calendar
 import datetime as dt
-from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
 
 import pytest
 import requests
 from freezegun import freeze_time
+from telegram import ParseMode
 
+from clients.cache import CachedHTTPClient
 from clients.fakes.http import FakeHTTPClient
 from commands import (
     About,
@@ -19,7 +22,10 @@ from commands import (
     Tomorrow,
     Week,
 )
+from config import KEITHFEM_BASE_URL
 from exceptions import HTTPError
+from models import TZ
+from schedule import WeekInfo
 
 
 class TestCommandsWithoutDependencies:
@@ -47,6 +53,32 @@ class TestCommandsWithoutDependencies:
         assert result == help
 
 
+class TestSend:
+    """Messages go through the sender in bot_data when there's one"""
+
+    def test_send_with_bot(self):
+        update, context = MagicMock(), MagicMock(bot_data={})
+        update.effective_chat.id = 42
+
+        About()(update, context)
+
+        context.bot.send_message.assert_called_once_with(
+            chat_id=42, text=About().msg, parse_mode=ParseMode.MARKDOWN
+        )
+
+    def test_send_with_sender(self):
+        sender = MagicMock()
+        update, context = MagicMock(), MagicMock(bot_data={"sender": sender})
+        update.effective_chat.id = 42
+
+        About()(update, context)
+
+        sender.send.assert_called_once_with(
+            chat_id=42, text=About().msg, parse_mode=ParseMode.MARKDOWN
+        )
+        context.bot.send_message.assert_not_called()
+
+
 class TestCommandsWithDependencies:
     """Methods with external dependencies"""
 
@@ -408,3 +440,147 @@ class TestCommandsWithDependencies:
                     mock_send.assert_called_once_with(None, None, msg)
 
             assert msg == expected_for_wednesday
+
+
+class TestCommandsWithSchedule:
+    """Commands served from the week-info schedule"""
+
+    @freeze_time(dt.datetime(2020, 12, 29, 21, tzinfo=TZ))  # Tuesday
+    def test_now(self, response_week_info):
+        with patch.object(Command, "send", return_value=None):
+            with patch("requests.get") as patched_get:
+                patched_get.return_value = response_week_info
+                schedule = WeekInfo(http_client=requests)
+                msg = Now(http_client=None, schedule=schedule)(
+                    update=None, context=None
+                )
+
+        assert msg == "*Hardcore Tuesdays* (20:00 - 22:00 _🇩🇪 time!_)"
+
+    @freeze_time(dt.datetime(2020, 12, 29, 22, 30, tzinfo=TZ))  # Tuesday
+    def test_now_is_empty(self, response_week_info):
+        with patch.object(Command, "send", return_value=None):
+            with patch("requests.get") as patched_get:
+                patched_get.return_value = response_week_info
+                schedule = WeekInfo(http_client=requests)
+                msg = Now(http_client=None, schedule=schedule)(
+                    update=None, context=None
+                )
+
+        assert msg == (
+            "Nothing being broadcasted at the moment 🥺.\n"
+            "Check the weekly schedule with /week command."
+        )
+
+    @freeze_time(dt.datetime(2020, 12, 29, 21, tzinfo=TZ))  # Tuesday
+    def test_next(self, response_week_info):
+        with patch.object(Command, "send", return_value=None):
+            with patch("requests.get") as patched_get:
+                patched_get.return_value = response_week_info
+                schedule = WeekInfo(http_client=requests)
+                msg = Next(http_client=None, schedule=schedule)(
+                    update=None, context=None
+                )
+
+        assert msg == "*DJ MFK - Best of the 20Tens* (00:00 - 02:00 _🇩🇪 time!_)"
+
+    @freeze_time("2020-12-29")  # Tuesday
+    def test_commands_share_one_request(self, response_week_info):
+        with patch.object(Command, "send", return_value=None):
+            with patch("requests.get") as patched_get:
+                patched_get.return_value = response_week_info
+                http_client = CachedHTTPClient(
+                    requests, ttls={KEITHFEM_BASE_URL + "week-info": 60}
+                )
+                week_info = WeekInfo(http_client=http_client)
+
+                today = Today(http_client=None, schedule=week_info)(None, None)
+                tomorrow = Tomorrow(http_client=None, schedule=week_info)(None, None)
+                week = Week(http_client=None, schedule=week_info)(None, None)
+
+                patched_get.assert_called_once()
+
+        assert today.startswith("Shows for Tuesday")
+        assert tomorrow.startswith("Shows for Wednesday")
+        assert week.startswith("*Shows for Monday*")
+
+    @freeze_time(dt.datetime(2020, 12, 29, 21, tzinfo=TZ))  # Tuesday
+    def test_stale_notice(self, response_week_info):
+        clock = [0.0]
+        http_client = CachedHTTPClient(
+            requests,
+            ttls={KEITHFEM_BASE_URL + "week-info": 60},
+            clock=lambda: clock[0],
+            spawn=lambda revalidate: revalidate(),
+        )
+        schedule = WeekInfo(http_client=http_client)
+        now = Now(http_client=None, schedule=schedule)
+
+        with patch.object(Command, "send", return_value=None):
+            with patch("requests.get") as patched_get:
+                patched_get.return_value = response_week_info
+                assert not now(update=None, context=None).endswith("ago)_")
+
+                patched_get.side_effect = HTTPError("Airtime is down")
+                clock[0] = 25 * 60
+                msg = now(update=None, context=None)
+
+        assert msg == (
+            "*Hardcore Tuesdays* (20:00 - 22:00 _🇩🇪 time!_)\n_(cached 25 min ago)_"
+        )
+
+    @freeze_time("2020-12-29")  # Tuesday
+    def test_concurrent_day_commands(self, response_week_info):
+        week_info = WeekInfo(http_client=CachedHTTPClient(requests))
+        today = Today(http_client=None, schedule=week_info)
+        tomorrow = Tomorrow(http_client=None, schedule=week_info)
+
+        with patch.object(Command, "send", return_value=None):
+            with patch("requests.get") as patched_get:
+                patched_get.return_value = response_week_info
+                with ThreadPoolExecutor(max_workers=8) as executor:
+                    calls = [
+                        executor.submit(command, None, None)
+                        for command in [today, tomorrow] * 50
+                    ]
+                    msgs = {call.result() for call in calls}
+
+        assert len(msgs) == 2
+        assert {msg.split("\n")[0] for msg in msgs} == {
+            "Shows for Tuesday _🇩🇪 time!_",
+            "Shows for Wednesday _🇩🇪 time!_",
+        }
+
+    @freeze_time("2020-12-29")  # Tuesday
+    def test_rendered_messages_are_memoized(self, response_week_info):
+        week = Week(http_client=None, schedule=WeekInfo(http_client=requests))
+
+        with patch.object(Command, "send", return_value=None):
+            with patch("requests.get") as patched_get:
+                patched_get.return_value = response_week_info
+                with patch.object(
+                    Week, "_parse_response", wraps=week._parse_response
+                ) as parse_response:
+                    first = week(update=None, context=None)
+                    second = week(update=None, context=None)
+
+                    parse_response.assert_called_once()
+
+        assert second is first
+
+    def test_rendered_messages_follow_the_schedule(
+        self, response_week_info, response_week_info_with_empty_days
+    ):
+        today = Today(http_client=None, schedule=WeekInfo(http_client=requests))
+
+        with patch.object(Command, "send", return_value=None):
+            with patch("requests.get") as patched_get:
+                patched_get.return_value = response_week_info
+                with freeze_time("2020-12-29"):  # Tuesday
+                    assert today(None, None).startswith("Shows for Tuesday")
+                with freeze_time("2020-12-30"):  # Wednesday
+                    assert today(None, None).startswith("Shows for Wednesday")
+
+                patched_get.return_value = response_week_info_with_empty_days
+                with freeze_time("2020-12-29"):  # Tuesday
+                    assert today(None, None).startswith("No shows")
@@ -0,0 +1,39 @@
+import json
+
+from formatting import DAY_TITLES, day_shows, show_times, week_shows
+from models import Show
+from schedule import WeekSchedule
+
+
+class TestFormatting:
+    def test_day_titles(self):
+        assert DAY_TITLES["tuesday"] == "Tuesday"
+        assert DAY_TITLES["nextmonday"] == "Monday"
+
+    def test_show_times(self, show):
+        assert show_times(Show.from_airtime(show)) == (
+            "00:00",
+            "02:00",
+            "Hardcore Tuesday Revisits",
+        )
+
+    def test_day_shows(self, response_week_info):
+        days = WeekSchedule(json.loads(response_week_info)).days
+
+        lines = day_shows(days["tuesday"]).splitlines()
+
+        assert len(lines) == len(days["tuesday"])
+        assert lines[-1] == "(20:00 - 22:00) - *Hardcore Tuesdays*"
+        assert day_shows(()) == ""
+
+    def test_week_shows_skips_next_week(self, response_week_info_with_empty_days):
+        days = WeekSchedule(json.loads(response_week_info_with_empty_days)).days
+
+        msg = week_shows(days)
+
+        assert msg.startswith("*Shows for Wednesday*\n")
+        assert msg.count("*Shows for") == 5
+        assert msg.endswith("_ All shows are in 🇩🇪 time!_")
+
+    def test_week_shows_without_shows(self):
+        assert week_shows(WeekSchedule({}).days) == ""
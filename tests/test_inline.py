@@ -0,0 +1,78 @@
+import datetime as dt
+import json
+from unittest.mock import MagicMock
+
+from freezegun import freeze_time
+
+from commands import Next, Now, Search, Today, Week
+from inline import InlineQuery, show_id
+from models import TZ
+from schedule import WeekSchedule
+from search import ShowIndex
+
+
+def inline_query(response_week_info, http_client=None):
+    week = WeekSchedule(json.loads(response_week_info), version="v1")
+    schedule = MagicMock(stale_for=lambda: None, snapshot=lambda: week)
+    index = ShowIndex()
+    index.update(week)
+    commands = {
+        "now": Now(http_client, schedule=schedule),
+        "next": Next(http_client, schedule=schedule),
+        "today": Today(http_client, schedule=schedule),
+        "week": Week(http_client, schedule=schedule),
+    }
+    return InlineQuery(commands, Search(index), schedule, cache_time=300)
+
+
+@freeze_time(dt.datetime(2020, 12, 29, 21, 0, 0, tzinfo=TZ))
+class TestInlineQuery:
+    def test_every_command_without_query(self, response_week_info):
+        results = inline_query(response_week_info).results("")
+
+        assert [result.id for result in results] == ["now", "next", "today", "week"]
+        assert results[0].title == "On air now"
+        assert results[0].description == ("Hardcore Tuesdays (20:00 - 22:00 🇩🇪 time!)")
+
+    def test_command(self, response_week_info):
+        results = inline_query(response_week_info).results(" NO ")
+
+        assert [result.id for result in results] == ["now"]
+        content = results[0].input_message_content
+        assert content.message_text == (
+            "*Hardcore Tuesdays* (20:00 - 22:00 _🇩🇪 time!_)"
+        )
+        assert content.parse_mode == "Markdown"
+
+    def test_search(self, response_week_info):
+        results = inline_query(response_week_info).results("kraut")
+
+        assert [result.title for result in results] == [
+            "Kraut Kontrol",
+            "Kraut Kontrol Revisited",
+        ]
+        assert results[0].id == show_id("Kraut Kontrol")
+        assert results[1].id != results[0].id
+
+    def test_show_ids_are_short_and_unique(self):
+        long_name = "é" * 60
+
+        assert len(show_id(long_name).encode()) <= 64
+        assert show_id(long_name) != show_id(long_name + " Revisited")
+        assert show_id("Kraut Kontrol") == show_id("KRAUT KONTROL")
+
+    def test_answer_is_cached_until_the_show_ends(self, response_week_info):
+        http_client = MagicMock()
+        inline = inline_query(response_week_info, http_client)
+        update = MagicMock()
+        update.inline_query.query = "now"
+
+        results = inline(update, None)
+
+        update.inline_query.answer.assert_called_once_with(
+            results, cache_time=300, is_personal=False
+        )
+        with freeze_time(dt.datetime(2020, 12, 29, 21, 59, 30, tzinfo=TZ)):
+            inline(update, None)
+        assert update.inline_query.answer.call_args.kwargs["cache_time"] == 30
+        http_client.get.assert_not_called()
@@ -0,0 +1,147 @@
+from unittest.mock import MagicMock
+from urllib import error, request
+
+import pytest
+
+from clients.singleflight import SingleFlight
+from exceptions import HTTPError
+from metrics import Histogram, Metrics, MetricsServer, phase
+from sender import Sender
+
+
+class TestHistogram:
+    def test_buckets_are_cumulative(self):
+        histogram = Histogram("latency", "Latency.", ("phase",), buckets=(0.1, 1))
+        histogram.observe(0.05, phase="send")
+        histogram.observe(0.5, phase="send")
+
+        assert list(histogram.samples()) == [
+            ('latency_bucket{phase="send",le="0.1"}', 1),
+            ('latency_bucket{phase="send",le="1"}', 2),
+            ('latency_bucket{phase="send",le="+Inf"}', 2),
+            ('latency_sum{phase="send"}', 0.55),
+            ('latency_count{phase="send"}', 2),
+        ]
+
+
+class TestMetrics:
+    def test_phases(self, clock):
+        metrics = Metrics(clock=clock)
+
+        def command(update, context):
+            with phase("fetch"):
+                clock.now += 0.5
+            clock.now += 0.25
+            with phase("send"):
+                clock.now += 0.125
+            return "msg"
+
+        assert metrics.instrument("now", command)(None, None) == "msg"
+
+        samples = dict(metrics.latency.samples())
+        sums = {
+            phase: samples[
+                'keithfembot_command_seconds_sum{command="now",phase="%s"}' % phase
+            ]
+            for phase in ("fetch", "format", "send")
+        }
+        assert sums == {"fetch": 0.5, "format": 0.25, "send": 0.125}
+        assert dict(metrics.calls.samples()) == {
+            'keithfembot_command_calls_total{command="now",outcome="ok"}': 1
+        }
+
+    def test_http_errors(self):
+        metrics = Metrics()
+        command = MagicMock(side_effect=HTTPError("airtime is down"))
+
+        with pytest.raises(HTTPError):
+            metrics.instrument("week", command)(None, None)
+
+        assert dict(metrics.http_errors.samples()) == {
+            'keithfembot_command_http_errors_total{command="week"}': 1
+        }
+        assert dict(metrics.calls.samples()) == {
+            'keithfembot_command_calls_total{command="week",outcome="error"}': 1
+        }
+
+    def test_phase_outside_a_command(self):
+        with phase("fetch"):
+            pass
+
+    def test_render(self):
+        metrics = Metrics()
+        metrics.watch_cache(
+            MagicMock(
+                hits=3,
+                stale=0,
+                misses=1,
+                errors=0,
+                hit_ratio=lambda: 0.75,
+                flight=SingleFlight(),
+            )
+        )
+        metrics.watch_schedule(MagicMock(staleness=None, flight=SingleFlight()))
+        metrics.instrument("about", lambda update, context: "about")(None, None)
+
+        text = metrics.render()
+
+        assert "# TYPE keithfembot_command_calls_total counter\n" in text
+        assert "# TYPE keithfembot_command_seconds histogram\n" in text
+        assert (
+            'keithfembot_command_calls_total{command="about",outcome="ok"} 1\n' in text
+        )
+        assert "keithfembot_cache_hits_total 3\n" in text
+        assert "keithfembot_cache_hit_ratio 0.75\n" in text
+        assert "keithfembot_schedule_staleness_seconds NaN\n" in text
+        assert "keithfembot_cache_coalesced_total 0\n" in text
+        assert "keithfembot_schedule_refreshes_coalesced_total 0\n" in text
+
+    def test_watch_sender(self, clock):
+        class SlowBot:
+            def send_message(self, chat_id, **kwargs):
+                clock.now += 0.2
+
+        sender = Sender(SlowBot(), clock=clock)
+        sender.send(1, text="hi")
+        clock.now = 1.0
+        sender.process()
+        metrics = Metrics()
+        metrics.watch_sender(sender)
+
+        text = metrics.render()
+
+        assert "keithfembot_sender_sent 1\n" in text
+        assert "keithfembot_sender_wait_seconds_total 1.2\n" in text
+        assert "keithfembot_sender_wait_max_seconds 1.2\n" in text
+        assert (
+            'keithfembot_telegram_send_seconds_bucket{outcome="ok",le="0.25"} 1\n'
+            in text
+        )
+        assert (
+            'keithfembot_telegram_send_seconds_bucket{outcome="ok",le="0.1"} 0\n'
+            in text
+        )
+
+
+class TestMetricsServer:
+    @pytest.fixture
+    def server(self):
+        metrics = Metrics()
+        metrics.instrument("about", lambda update, context: "about")(None, None)
+        server = MetricsServer(metrics, port=0)
+        server.start()
+        yield server
+        server.stop()
+
+    def url(self, server, path):
+        return "http://127.0.0.1:%d%s" % (server.server_address[1], path)
+
+    def test_metrics(self, server):
+        with request.urlopen(self.url(server, "/metrics")) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert b'command="about"' in response.read()
+
+    def test_not_found(self, server):
+        with pytest.raises(error.HTTPError) as exc:
+            request.urlopen(self.url(server, "/"))
+        assert exc.value.code == 404
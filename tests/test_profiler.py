@@ -0,0 +1,128 @@
+import pstats
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from commands import Profile
+from profiler import Profiler
+
+
+def slow(update, context):
+    time.sleep(0.02)
+    return "slow"
+
+
+def update(user_id=1):
+    update = MagicMock()
+    update.effective_user.id = user_id
+    return update
+
+
+def context(*args):
+    return MagicMock(args=list(args))
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    return Profiler(directory=str(tmp_path), interval=0.001, random=lambda: 0.5)
+
+
+class TestProfiler:
+    def test_not_profiled_until_enabled(self, profiler):
+        handler = profiler.profiled("slow", slow)
+
+        assert handler(None, None) == "slow"
+        assert profiler.calls["slow"] == 0
+        assert profiler.dump() == []
+
+    def test_profiles_the_sampled_calls(self, profiler):
+        handler = profiler.profiled("slow", slow)
+
+        profiler.enable("slow", 0.6)
+        assert handler(None, None) == "slow"
+        profiler.enable("slow", 0.4)
+        assert handler(None, None) == "slow"
+
+        assert profiler.calls["slow"] == 1
+
+    def test_disable(self, profiler):
+        handler = profiler.profiled("slow", slow)
+        profiler.enable("slow")
+
+        profiler.disable()
+        handler(None, None)
+
+        assert profiler.calls["slow"] == 0
+
+    def test_rejects_unknown_commands_and_rates(self, profiler):
+        profiler.profiled("slow", slow)
+
+        with pytest.raises(ValueError):
+            profiler.enable("fast")
+        with pytest.raises(ValueError):
+            profiler.enable("slow", 0)
+        with pytest.raises(ValueError):
+            profiler.enable("slow", 2)
+
+    def test_dump(self, profiler):
+        handler = profiler.profiled("slow", slow)
+        profiler.enable("slow")
+        handler(None, None)
+        handler(None, None)
+
+        paths = profiler.dump()
+
+        assert [path.rsplit(".", 1)[1] for path in paths] == ["pstats", "collapsed"]
+        stats = pstats.Stats(paths[0])
+        assert stats.total_calls > 0  # type: ignore
+        assert any(name == "slow" for _, _, name in stats.stats)  # type: ignore
+        with open(paths[1]) as collapsed:
+            lines = collapsed.read().splitlines()
+        assert lines
+        # The stacks start at the command, not at the dispatcher.
+        assert all(line.startswith("test_profiler.py:slow") for line in lines)
+        # Dumping starts over.
+        assert profiler.dump() == []
+
+    def test_concurrent_calls_are_not_profiled(self, profiler):
+        handler = profiler.profiled("slow", slow)
+        profiler.enable("slow")
+
+        with profiler._running:
+            handler(None, None)
+
+        assert profiler.calls["slow"] == 0
+
+
+class TestProfile:
+    def test_only_admins(self, profiler):
+        command = Profile(profiler, admins={1})
+        command.send = MagicMock()  # type: ignore
+
+        msg = command(update(user_id=2), context("on", "slow"))
+
+        assert msg == "Only the admins of the bot can profile it 🙅"
+        assert profiler.rates == {}
+
+    def test_on_off(self, profiler):
+        profiler.profiled("slow", slow)
+        command = Profile(profiler, admins={1})
+        command.send = MagicMock()  # type: ignore
+
+        assert command(update(), context("on", "slow", "0.1")) == (
+            "Profiling 10% of `/slow` 🔬"
+        )
+        assert profiler.rates == {"slow": 0.1}
+        assert command(update(), context("off")) == (
+            "Profiling stopped for every command 🛑"
+        )
+        assert profiler.rates == {}
+
+    def test_errors_and_usage(self, profiler):
+        command = Profile(profiler, admins={1})
+        command.send = MagicMock()  # type: ignore
+
+        assert command(update(), context("on", "fast")) == "Unknown command 'fast'."
+        assert command(update(), context()) == command.msg
+        assert command(update(), context("dump")) == "Nothing profiled yet 🤷"
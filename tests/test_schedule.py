@@ -0,0 +1,278 @@
+import datetime as dt
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+import requests
+
+from clients.cache import CachedHTTPClient
+from exceptions import HTTPError
+from models import TZ, Show
+from schedule import DAYS, ScheduleRefresher, WeekInfo, WeekSchedule
+
+
+class TestWeekSchedule:
+    def test_days(self, response_week_info):
+        schedule = WeekSchedule(json.loads(response_week_info))
+
+        assert list(schedule.days) == DAYS
+        assert schedule.days["tuesday"][-1].name == "Hardcore Tuesdays"
+
+    def test_shows_are_sorted(self, response_week_info):
+        schedule = WeekSchedule(json.loads(response_week_info))
+
+        assert schedule.starts == sorted(schedule.starts)
+        assert schedule.starts == [show.starts for show in schedule.shows]
+
+    def test_at(self, response_week_info):
+        schedule = WeekSchedule(json.loads(response_week_info))
+
+        show = schedule.at(dt.datetime(2020, 12, 29, 21, 0, tzinfo=TZ))
+        assert show.name == "Hardcore Tuesdays"
+
+        show = schedule.at(dt.datetime(2020, 12, 29, 20, 0, tzinfo=TZ))
+        assert show.name == "Hardcore Tuesdays"
+
+    def test_upcoming(self, response_week_info):
+        schedule = WeekSchedule(json.loads(response_week_info))
+        show_id = schedule.ids["kraut kontrol"]
+
+        shows = schedule.upcoming(show_id, dt.datetime(2020, 12, 30, 19, tzinfo=TZ), 5)
+        assert [show.starts.day for show in shows] == [30, 6]
+        assert all(show.id == show_id for show in shows)
+        shows = schedule.upcoming(show_id, dt.datetime(2020, 12, 30, 20, tzinfo=TZ), 5)
+        assert [show.starts.day for show in shows] == [6]
+        assert (
+            schedule.upcoming("unknown", dt.datetime(2020, 12, 1, tzinfo=TZ), 5) == []
+        )
+
+    def test_at_without_show(self, response_week_info):
+        schedule = WeekSchedule(json.loads(response_week_info))
+
+        assert schedule.at(dt.datetime(2020, 12, 29, 22, 0, tzinfo=TZ)) is None
+        assert schedule.at(dt.datetime(2020, 12, 1, tzinfo=TZ)) is None
+        assert schedule.at(dt.datetime(2021, 2, 1, tzinfo=TZ)) is None
+
+    def test_after(self, response_week_info):
+        schedule = WeekSchedule(json.loads(response_week_info))
+
+        show = schedule.after(dt.datetime(2020, 12, 29, 21, 0, tzinfo=TZ))
+        assert show.name == "DJ MFK - Best of the 20Tens"
+        assert schedule.after(dt.datetime(2021, 2, 1, tzinfo=TZ)) is None
+
+    def test_empty(self):
+        schedule = WeekSchedule({})
+
+        assert schedule.at(dt.datetime(2020, 12, 29, tzinfo=TZ)) is None
+        assert schedule.after(dt.datetime(2020, 12, 29, tzinfo=TZ)) is None
+
+
+class TestWeekInfo:
+    def test_snapshot_is_rebuilt_only_on_changes(
+        self, response_week_info, response_week_info_with_empty_days
+    ):
+        week_info = WeekInfo(http_client=requests)
+
+        with patch("requests.get") as patched_get:
+            patched_get.return_value = response_week_info
+            first = week_info.snapshot()
+            assert week_info.snapshot() is first
+
+            patched_get.return_value = response_week_info_with_empty_days
+            assert week_info.snapshot() is not first
+
+
+class TestScheduleRefresher:
+    def test_refresh_swaps_schedule(
+        self, response_week_info, response_week_info_with_empty_days, airtime
+    ):
+        http_client = airtime(response_week_info)
+        refresher = ScheduleRefresher(http_client, "/week-info", "/live-info")
+
+        first = refresher.refresh()
+        assert refresher.snapshot() is first
+
+        http_client.responses["week-info"] = response_week_info_with_empty_days
+        refresher.refresh()
+        assert refresher.snapshot() is not first
+
+    def test_refresh_keeps_schedule_when_unchanged(self, response_week_info, airtime):
+        refresher = ScheduleRefresher(
+            airtime(response_week_info), "/week-info", "/live-info"
+        )
+
+        assert refresher.refresh() is refresher.refresh()
+
+    def test_week_info_parsed_only_when_changed(
+        self, response_week_info, response_live_info, airtime
+    ):
+        http_client = airtime(response_week_info, response_live_info)
+        refresher = ScheduleRefresher(http_client, "/week-info", "/live-info")
+        first = refresher.refresh()
+
+        # A new track on air, week-info unchanged.
+        http_client.responses["live-info"] = response_live_info.replace(
+            "Keith F&#039;em Bot DJ", "Keith F&#039;em Bot VJ"
+        )
+        with patch("schedule.Show.from_airtime", wraps=Show.from_airtime) as parse:
+            second = refresher.refresh()
+
+        assert second is not first
+        assert second.days is first.days
+        assert second.version == first.version
+        # Only the current and next shows of live-info.
+        assert parse.call_count == 2
+        show = second.at(dt.datetime(2020, 12, 27, 21, 0, tzinfo=TZ))
+        assert show.name == "Keith F'em Bot VJ"
+
+    def test_live_info_takes_precedence(
+        self, response_week_info, response_live_info, airtime
+    ):
+        refresher = ScheduleRefresher(
+            airtime(response_week_info, response_live_info),
+            "/week-info",
+            "/live-info",
+        )
+
+        show = refresher.snapshot().at(dt.datetime(2020, 12, 27, 21, 0, tzinfo=TZ))
+        assert show.name == "Keith F'em Bot DJ"
+        assert show.id == 2651
+
+    def test_concurrent_refreshes_are_coalesced(self, response_week_info, airtime):
+        release = threading.Event()
+
+        class BlockingHTTPClient(airtime):
+            def get(self, url, headers=None):
+                release.wait(timeout=1)
+                return super().get(url, headers)
+
+        http_client = BlockingHTTPClient(response_week_info)
+        refresher = ScheduleRefresher(http_client, "/week-info", "/live-info")
+        notified = []
+        refresher.on_refresh(notified.append)
+
+        threads = [threading.Thread(target=refresher.snapshot) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        while refresher.flight.calls < 2:
+            release.wait(timeout=0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        assert http_client.calls == 2  # week-info and live-info, once
+        assert refresher.flight.coalesced == 1
+        assert len(notified) == 1
+
+    def test_snapshot_does_not_fetch_once_refreshed(self, response_week_info, airtime):
+        http_client = airtime(response_week_info)
+        refresher = ScheduleRefresher(http_client, "/week-info", "/live-info")
+
+        refresher.snapshot()
+        refresher.snapshot()
+
+        assert http_client.calls == 2  # week-info and live-info, once
+
+    def test_health(self, response_week_info, clock, airtime):
+        http_client = airtime(response_week_info)
+        refresher = ScheduleRefresher(
+            http_client, "/week-info", "/live-info", max_staleness=60, clock=clock
+        )
+        assert refresher.staleness is None
+        assert not refresher.healthy
+
+        refresher.refresh()
+        clock.now += 30
+        assert refresher.staleness == 30
+        assert refresher.healthy
+
+        http_client.responses["week-info"] = None
+        with pytest.raises(HTTPError):
+            refresher.refresh()
+        clock.now += 31
+        assert not refresher.healthy
+
+    def test_delay_has_jitter(self):
+        refresher = ScheduleRefresher(None, interval=60, jitter=10)
+
+        delays = {refresher._delay() for _ in range(20)}
+
+        assert all(50 <= delay <= 70 for delay in delays)
+        assert len(delays) > 1
+
+    def test_start_and_stop(self, response_week_info, airtime):
+        http_client = airtime(response_week_info)
+        refresher = ScheduleRefresher(
+            http_client, "/week-info", "/live-info", interval=60
+        )
+
+        refresher.start()
+        refresher.stop()
+
+        assert refresher.refreshed_at is not None
+
+    def test_stale_snapshot(self, response_week_info, clock, airtime):
+        http_client = airtime(response_week_info)
+        refresher = ScheduleRefresher(
+            http_client,
+            "/week-info",
+            "/live-info",
+            max_staleness=60,
+            max_stale=600,
+            clock=clock,
+        )
+        schedule = refresher.snapshot()
+        assert refresher.stale_for() is None
+
+        http_client.responses["week-info"] = None
+        clock.now += 300
+        assert refresher.snapshot() is schedule
+        assert refresher.stale_for() == 300
+
+        clock.now += 301
+        with pytest.raises(HTTPError):
+            refresher.snapshot()
+
+    def test_behind_cache(self, response_week_info, clock, airtime):
+        http_client = airtime(response_week_info, "{}")
+        cache = CachedHTTPClient(
+            http_client,
+            ttls={"/week-info": 300, "/live-info": 30},
+            max_stale=3600,
+            clock=clock,
+            spawn=lambda target: target(),
+        )
+        refresher = ScheduleRefresher(
+            cache, "/week-info", "/live-info", max_staleness=60, clock=clock
+        )
+
+        schedule = refresher.refresh()
+        assert refresher.refresh() is schedule
+        assert http_client.calls == 2
+
+        # Airtime fails, the cached week-info is served as old as it is.
+        http_client.responses["week-info"] = None
+        clock.now += 400
+        assert refresher.refresh() is schedule
+        assert refresher.staleness == 400
+        assert refresher.stale_for() == 400
+
+
+class TestShow:
+    def test_from_airtime(self, show):
+        parsed = Show.from_airtime(dict(show, name="Keith F&#039;em Bot DJ"))
+
+        assert parsed.id == 2370
+        assert parsed.instance_id == 10138
+        assert parsed.name == "Keith F'em Bot DJ"
+        assert parsed.starts == dt.datetime(2020, 12, 27, tzinfo=TZ)
+        assert parsed.ends == dt.datetime(2020, 12, 27, 2, tzinfo=TZ)
+        assert parsed.key == 10138
+
+    def test_is_frozen_and_slotted(self, show):
+        parsed = Show.from_airtime(show)
+
+        with pytest.raises(AttributeError):
+            parsed.name = "Another show"  # type: ignore
+        assert not hasattr(parsed, "__dict__")
@@ -0,0 +1,138 @@
+import datetime as dt
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+from freezegun import freeze_time
+
+from commands import NextAirings, Search
+from models import TZ, Show
+from schedule import WeekSchedule
+from search import ShowIndex, trigrams
+
+
+@pytest.fixture
+def index(response_week_info):
+    index = ShowIndex()
+    index.update(WeekSchedule(json.loads(response_week_info)))
+    return index
+
+
+def week(*names):
+    """A WeekSchedule-like object with a show per name"""
+    starts = dt.datetime(2020, 12, 28, tzinfo=TZ)
+    shows = [
+        Show(None, None, name, starts, starts + dt.timedelta(hours=1)) for name in names
+    ]
+    return MagicMock(shows=shows)
+
+
+class TestShowIndex:
+    def test_trigrams(self):
+        assert trigrams("Kraut") == {"  k", " kr", "kra", "rau", "aut", "ut "}
+        assert trigrams("  ") == set()
+
+    def test_search(self, index):
+        assert index.search("kraut") == ["kraut kontrol", "kraut kontrol revisited"]
+        assert index.search("KRAUT kontrol", limit=1) == ["kraut kontrol"]
+        assert index.search("nothing like it") == []
+
+    def test_search_with_typos(self, index):
+        assert index.search("krat kontrl")[0] == "kraut kontrol"
+        assert index.search("angstkiste") == ["ängstkiste"]
+
+    def test_update_is_incremental(self):
+        index = ShowIndex()
+        index.update(week("Kraut Kontrol", "Snake Jazz"))
+        postings = index.postings
+
+        index.update(week("Kraut Kontrol", "Hardcore Tuesdays"))
+
+        assert index.postings is postings
+        assert index.search("snake") == []
+        assert index.search("hardcore") == ["hardcore tuesdays"]
+        assert "jaz" not in index.postings
+
+    def test_upcoming(self, index):
+        shows = index.upcoming(
+            "kraut kontrol", dt.datetime(2020, 12, 30, 19, tzinfo=TZ), 3
+        )
+
+        assert [show.starts.day for show in shows] == [30, 6]
+        assert index.upcoming("kraut kontrol", shows[-1].ends, 3) == []
+        assert index.upcoming("unknown", shows[-1].ends, 3) == []
+
+
+class TestSearch:
+    def call(self, command, *args):
+        update, context = MagicMock(), MagicMock(args=list(args))
+        with patch.object(Search, "send") as mock_send:
+            result = command(update, context)
+            mock_send.assert_called_once_with(update, context, result)
+        return result
+
+    @freeze_time(dt.datetime(2020, 12, 29, 21, tzinfo=TZ))
+    def test_search(self, index):
+        result = self.call(Search(index, max_airings=1), "kraut")
+
+        assert result == (
+            "*Kraut Kontrol*\n"
+            "Wednesday 30 Dec 18:00 - 20:00\n"
+            "\n"
+            "*Kraut Kontrol Revisited*\n"
+            "Saturday 2 Jan 08:00 - 10:00\n"
+            "_ All shows are in 🇩🇪 time!_"
+        )
+
+    @freeze_time(dt.datetime(2020, 12, 29, 21, tzinfo=TZ))
+    def test_nothing_found(self, index):
+        result = self.call(Search(index), "zz_top*")
+
+        assert result == "No upcoming shows match _zz\\_top\\*_ 🤷"
+
+    def test_without_text(self, index):
+        command = Search(index)
+
+        assert self.call(command) == command.msg
+
+
+class TestNextAirings:
+    def call(self, command, *args):
+        update, context = MagicMock(), MagicMock(args=list(args))
+        with patch.object(NextAirings, "send") as mock_send:
+            result = command(update, context)
+            mock_send.assert_called_once_with(update, context, result)
+        return result
+
+    def command(self, response_week_info, index):
+        week = WeekSchedule(json.loads(response_week_info))
+        schedule = MagicMock(stale_for=lambda: None, snapshot=lambda: week)
+        return NextAirings(index, schedule, count=2)
+
+    @freeze_time(dt.datetime(2020, 12, 29, 21, tzinfo=TZ))
+    def test_show(self, response_week_info, index):
+        command = self.command(response_week_info, index)
+
+        result = self.call(command, "Kraut", "Kontrol", "Revisited")
+
+        assert result == (
+            "*Kraut Kontrol Revisited*\n"
+            "Saturday 2 Jan 08:00 - 10:00\n"
+            "Saturday 9 Jan 08:00 - 10:00\n"
+            "_ All shows are in 🇩🇪 time!_"
+        )
+
+    @freeze_time(dt.datetime(2020, 12, 29, 21, tzinfo=TZ))
+    def test_closest_name(self, response_week_info, index):
+        command = self.command(response_week_info, index)
+
+        assert self.call(command, "krat", "kontrl").startswith("*Kraut Kontrol*\n")
+
+    @freeze_time(dt.datetime(2021, 2, 1, tzinfo=TZ))
+    def test_no_airings(self, response_week_info, index):
+        command = self.command(response_week_info, index)
+
+        assert self.call(command, "Kraut", "Kontrol") == (
+            "No upcoming airings of _Kraut Kontrol_ 🤷\n"
+            "Check the weekly schedule with /week command."
+        )
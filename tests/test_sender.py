@@ -0,0 +1,190 @@
+import threading
+import time
+
+import pytest
+from telegram.error import BadRequest, RetryAfter
+
+from sender import BROADCAST, DIRECT, SWEEP_INTERVAL, Sender, TokenBucket
+
+
+class FakeBot:
+    """Records the messages, optionally failing the first ones."""
+
+    def __init__(self, errors=None):
+        self.messages = []
+        self.errors = list(errors or [])
+
+    def send_message(self, chat_id, **kwargs):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.messages.append((chat_id, kwargs["text"]))
+
+
+def drain(sender):
+    """Processes the queue until it has to wait, returns the wait."""
+    while True:
+        wait = sender.process()
+        if wait != 0:
+            return wait
+
+
+class TestTokenBucket:
+    def test_burst_and_refill(self, clock):
+        bucket = TokenBucket(rate=2, capacity=2, clock=clock)
+
+        bucket.take()
+        bucket.take()
+        assert bucket.delay() == pytest.approx(0.5)
+
+        clock.now = 0.5
+        assert bucket.delay() == 0
+        clock.now = 100
+        bucket.take()
+        bucket.take()
+        assert bucket.delay() > 0
+
+
+class TestSender:
+    def test_global_rate(self, clock):
+        bot = FakeBot()
+        sender = Sender(bot, global_rate=2, chat_rate=600, chat_burst=10, clock=clock)
+        for chat_id in range(5):
+            sender.send(chat_id, text="hi")
+
+        assert drain(sender) == pytest.approx(0.5)
+        assert len(bot.messages) == 2
+        assert sender.depth == 3
+
+        clock.now = 1
+        drain(sender)
+        assert len(bot.messages) == 4
+
+    def test_chat_rate_does_not_block_other_chats(self, clock):
+        bot = FakeBot()
+        sender = Sender(bot, global_rate=100, chat_rate=60, chat_burst=1, clock=clock)
+        sender.send(1, text="first")
+        sender.send(1, text="second")
+        sender.send(2, text="other chat")
+
+        assert drain(sender) == pytest.approx(1)
+        assert bot.messages == [(1, "first"), (2, "other chat")]
+
+        clock.now = 1
+        drain(sender)
+        assert bot.messages[-1] == (1, "second")
+
+    def test_direct_replies_go_first(self):
+        bot = FakeBot()
+        sender = Sender(bot, global_rate=100, chat_rate=600, chat_burst=10)
+        sender.send(1, priority=BROADCAST, text="broadcast")
+        sender.send(2, priority=DIRECT, text="reply")
+        sender.send(3, priority=BROADCAST, text="another broadcast")
+
+        drain(sender)
+
+        assert [text for _, text in bot.messages] == [
+            "reply",
+            "broadcast",
+            "another broadcast",
+        ]
+
+    def test_send_many(self):
+        bot = FakeBot()
+        sender = Sender(bot, global_rate=100, chat_rate=600, chat_burst=10)
+        sender.send_many([1, 2, 3], text="show starts")
+        sender.send(4, text="reply")
+
+        drain(sender)
+
+        assert bot.messages == [
+            (4, "reply"),
+            (1, "show starts"),
+            (2, "show starts"),
+            (3, "show starts"),
+        ]
+
+    def test_retry_after(self, clock):
+        bot = FakeBot(errors=[RetryAfter(3)])
+        sender = Sender(bot, global_rate=100, chat_rate=600, chat_burst=10, clock=clock)
+        sender.send(1, text="hi")
+
+        assert drain(sender) == pytest.approx(3)
+        assert sender.retries == 1
+        assert bot.messages == []
+
+        clock.now = 3
+        drain(sender)
+        assert bot.messages == [(1, "hi")]
+
+    def test_failed_messages_are_dropped(self):
+        bot = FakeBot(errors=[BadRequest("Chat not found")])
+        sender = Sender(bot)
+        sender.send(1, text="hi")
+
+        assert drain(sender) is None
+        assert sender.failed == 1
+        assert sender.depth == 0
+
+    def test_unexpected_errors_do_not_stop_the_sender(self):
+        sent = threading.Event()
+
+        class SignallingBot(FakeBot):
+            def send_message(self, chat_id, **kwargs):
+                super().send_message(chat_id, **kwargs)
+                sent.set()
+
+        bot = SignallingBot(errors=[RuntimeError("boom")])
+        sender = Sender(bot)
+        sender.start()
+        try:
+            sender.send(1, text="first")
+            sender.send(1, text="second")
+            assert sent.wait(5)
+        finally:
+            sender.stop()
+
+        assert bot.messages == [(1, "second")]
+        assert sender.failed == 1
+        assert sender.depth == 0
+        samples = dict(sender.latency.samples())
+        assert samples['keithfembot_telegram_send_seconds_count{outcome="error"}'] == 1
+
+    def test_idle_chats_are_forgotten(self, clock):
+        sender = Sender(FakeBot(), chat_rate=60, chat_burst=2, clock=clock)
+        sender.send(1, text="hi")
+        drain(sender)
+        assert list(sender.chats) == [1]
+
+        # Chat 2 is throttled, chat 1 refilled long ago.
+        clock.now = SWEEP_INTERVAL - 0.5
+        for _ in range(3):
+            sender.send(2, text="hi")
+        drain(sender)
+        clock.now = SWEEP_INTERVAL
+        drain(sender)
+
+        assert list(sender.chats) == [2]
+        assert sender.depth == 1
+
+    def test_wait_metrics(self, clock):
+        sender = Sender(FakeBot(), global_rate=1, clock=clock)
+        sender.send(1, text="hi")
+        sender.send(2, text="hi")
+        drain(sender)
+        clock.now = 1
+        drain(sender)
+
+        assert sender.sent == 2
+        assert sender.wait_total == 1
+        assert sender.wait_max == 1
+
+    def test_start_and_stop(self):
+        bot = FakeBot()
+        sender = Sender(bot)
+        sender.start()
+        sender.send(1, text="hi")
+        while sender.sent == 0:
+            time.sleep(0.001)
+        sender.stop()
+
+        assert bot.messages == [(1, "hi")]
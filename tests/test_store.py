@@ -0,0 +1,121 @@
+import sqlite3
+
+import pytest
+
+from migrations import MIGRATIONS, migrate
+from store import Store
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = Store(str(tmp_path / "store.sqlite3"), batch_size=10)
+    yield store
+    store.close()
+
+
+class TestMigrations:
+    def test_migrate(self):
+        connection = sqlite3.connect(":memory:", isolation_level=None)
+
+        assert migrate(connection) == len(MIGRATIONS)
+        assert migrate(connection) == len(MIGRATIONS)
+        assert connection.execute("PRAGMA user_version").fetchone() == (
+            len(MIGRATIONS),
+        )
+
+    def test_new_migrations_are_applied(self):
+        connection = sqlite3.connect(":memory:", isolation_level=None)
+        migrate(connection, MIGRATIONS[:1])
+
+        assert migrate(connection) == len(MIGRATIONS)
+        connection.execute("SELECT * FROM chat_settings")
+
+
+class TestStore:
+    def test_wal_and_indexes(self, store):
+        (mode,) = store.connection.execute("PRAGMA journal_mode").fetchone()
+        plan = store.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT chat_id FROM subscriptions WHERE show IN (?, ?)",
+            ("show", "all"),
+        ).fetchall()
+
+        assert mode == "wal"
+        assert "subscriptions_show" in str(plan)
+
+    def test_writes_are_batched(self, store):
+        for chat_id in range(9):
+            store.subscribe(chat_id, "show")
+        assert store.flushes == 0
+
+        store.subscribe(9, "show")
+        assert store.flushes == 1
+        assert store.pending == []
+
+    def test_chats_for(self, store):
+        store.subscribe(1, "show")
+        store.subscribe(2, "all")
+        store.subscribe(3, "another show")
+
+        assert store.chats_for("show") == {1, 2}
+        assert store.flushes == 1
+        # Served from memory until a subscription of the show changes.
+        assert store.chats_for("show") is store.chats_for("show")
+        store.subscribe(4, "all")
+        assert store.chats_for("show") == {1, 2, 4}
+
+    def test_sees_the_writes_of_other_processes(self, tmp_path, store):
+        other = Store(str(tmp_path / "store.sqlite3"))
+        store.subscribe(1, "show")
+        assert store.chats_for("show") == {1}
+        assert store.chat_settings(1)["language"] is None
+
+        other.subscribe(2, "show")
+        other.set_chat_settings(1, language="de")
+        other.flush()
+
+        assert store.chats_for("show") == {1, 2}
+        assert store.chat_settings(1)["language"] == "de"
+        other.close()
+
+    def test_unsubscribe(self, store):
+        store.subscribe(1, "show")
+        store.subscribe(1, "another show")
+
+        assert store.unsubscribe(1, "show") is True
+        assert store.unsubscribe(1, "show") is False
+        assert store.shows_for(1) == ["another show"]
+        assert store.unsubscribe(1) is True
+        assert store.shows_for(1) == []
+
+    def test_chat_settings(self, store):
+        assert store.chat_settings(1) == {"timezone": None, "language": None}
+
+        store.set_chat_settings(1, timezone="Europe/Berlin")
+        store.set_chat_settings(1, language="de")
+
+        assert store.chat_settings(1) == {"timezone": "Europe/Berlin", "language": "de"}
+
+    def test_persists_on_close(self, tmp_path):
+        path = str(tmp_path / "store.sqlite3")
+        store = Store(path)
+        store.subscribe(1, "show")
+        store.set_chat_settings(1, language="de")
+        store.close()
+
+        store = Store(path)
+        assert store.chats_for("show") == {1}
+        assert store.chat_settings(1)["language"] == "de"
+        store.close()
+
+    def test_background_flush(self, tmp_path):
+        store = Store(str(tmp_path / "store.sqlite3"), flush_interval=0.01)
+        store.start()
+        store.subscribe(1, "show")
+        try:
+            for _ in range(500):
+                if store.flushes:
+                    break
+                store._stop.wait(0.01)
+        finally:
+            store.close()
+        assert store.flushes >= 1
@@ -0,0 +1,191 @@
+import datetime as dt
+import json
+import threading
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from commands import Subscribe, Unsubscribe
+from models import TZ
+from schedule import WeekSchedule
+from search import ShowIndex
+from sender import BROADCAST, Sender
+from subscriptions import Notifier, Subscriptions
+
+
+class TestSubscriptions:
+    def test_chats_for(self):
+        subscriptions = Subscriptions()
+        subscriptions.add(1, "Caprisonne Revisited")
+        subscriptions.add(2, "all")
+
+        assert subscriptions.chats_for("CAPRISONNE revisited") == {1, 2}
+        assert subscriptions.chats_for("Hardcore Tuesdays") == {2}
+
+    def test_remove(self):
+        subscriptions = Subscriptions()
+        subscriptions.add(1, "Caprisonne Revisited")
+        subscriptions.add(1, "all")
+
+        assert subscriptions.remove(1, "Hardcore Tuesdays") is False
+        assert subscriptions.remove(1, "all") is True
+        assert subscriptions.chats_for("Hardcore Tuesdays") == set()
+        assert subscriptions.remove(1) is True
+        assert subscriptions.chats_for("Caprisonne Revisited") == set()
+
+
+class TestNotifier:
+    def notifier(self, response_week_info, clock, sender):
+        subscriptions = Subscriptions()
+        subscriptions.add(1, "Caprisonne Revisited")
+        subscriptions.add(2, "all")
+        notifier = Notifier(subscriptions, sender, clock=clock)
+        notifier.schedule(WeekSchedule(json.loads(response_week_info)))
+        return notifier
+
+    def test_waits_for_the_next_start(self, response_week_info, clock):
+        clock.now = dt.datetime(2020, 12, 28, 8, 30, tzinfo=TZ)
+        sender = MagicMock()
+        notifier = self.notifier(response_week_info, clock, sender)
+
+        assert notifier.process() == 30 * 60
+        sender.send_many.assert_not_called()
+
+    def test_notifies_the_subscribed_chats(self, response_week_info, clock):
+        clock.now = dt.datetime(2020, 12, 28, 8, 30, tzinfo=TZ)
+        sender = MagicMock()
+        notifier = self.notifier(response_week_info, clock, sender)
+
+        clock.now = dt.datetime(2020, 12, 28, 9, 0, 1, tzinfo=TZ)
+        assert notifier.process() == 0
+        sender.send_many.assert_called_once()
+        chat_ids = sender.send_many.call_args.args[0]
+        kwargs = sender.send_many.call_args.kwargs
+        assert chat_ids == [1, 2]
+        assert kwargs["priority"] == BROADCAST
+        assert kwargs["text"] == (
+            "📻 Starting now: *Caprisonne Revisited* (09:00 - 11:00 _🇩🇪 time!_)"
+        )
+        assert notifier.process() == 2 * 3600 - 1
+
+    def test_a_new_schedule_does_not_notify_twice(self, response_week_info, clock):
+        clock.now = dt.datetime(2020, 12, 28, 9, 0, 1, tzinfo=TZ)
+        sender = MagicMock()
+        notifier = Notifier(Subscriptions(), sender, clock=clock)
+        notifier.since = dt.datetime(2020, 12, 28, 8, 30, tzinfo=TZ)
+        notifier.subscriptions.add(1, "all")
+        week = WeekSchedule(json.loads(response_week_info))
+
+        notifier.schedule(week)
+        notifier.process()
+        notifier.schedule(week)
+        notifier.process()
+
+        assert sender.send_many.call_count == 1
+
+    def test_fans_out_through_the_sender(self, response_week_info, clock):
+        bot = MagicMock()
+        sender = Sender(bot, global_rate=1000, chat_rate=600, chat_burst=10)
+        clock.now = dt.datetime(2020, 12, 28, 8, 59, 59, 999000, tzinfo=TZ)
+        notifier = self.notifier(response_week_info, clock, sender)
+        notifier.MAX_WAIT = 0.01
+        sent = threading.Event()
+        bot.send_message.side_effect = lambda **kwargs: sent.set()
+
+        notifier.start()
+        sender.start()
+        clock.now = dt.datetime(2020, 12, 28, 9, tzinfo=TZ)
+        try:
+            assert sent.wait(5)
+        finally:
+            notifier.stop()
+            sender.stop()
+        assert notifier.notified == 2
+
+
+class TestSubscribeCommands:
+    def call(self, command, *args):
+        update, context = MagicMock(), MagicMock(args=list(args))
+        update.effective_chat.id = 42
+        with patch.object(command.__class__, "send") as mock_send:
+            result = command(update, context)
+            mock_send.assert_called_once_with(update, context, result)
+        return result
+
+    @pytest.fixture
+    def index(self, response_week_info):
+        index = ShowIndex()
+        index.update(WeekSchedule(json.loads(response_week_info)))
+        return index
+
+    def test_subscribe(self, index):
+        subscriptions = Subscriptions()
+
+        result = self.call(Subscribe(subscriptions, index), "HARDCORE", "tuesdays")
+
+        assert result == "You'll get a message when *Hardcore Tuesdays* starts 📻"
+        assert subscriptions.chats_for("hardcore tuesdays") == {42}
+
+    def test_subscribe_closest_show(self, index):
+        subscriptions = Subscriptions()
+
+        result = self.call(Subscribe(subscriptions, index), "tuesdays")
+
+        assert result == "You'll get a message when *Hardcore Tuesdays* starts 📻"
+        assert subscriptions.chats_for("hardcore tuesdays") == {42}
+
+    def test_subscribe_unknown_show(self, index):
+        subscriptions = Subscriptions()
+
+        result = self.call(Subscribe(subscriptions, index), "zz_top*")
+
+        assert result == (
+            "No show matches _zz\\_top\\*_ 🤷\n"
+            "Check the weekly schedule with /week command."
+        )
+        assert subscriptions.store.shows_for(42) == []
+
+    def test_subscribe_all(self, index):
+        subscriptions = Subscriptions()
+
+        result = self.call(Subscribe(subscriptions, index), "all")
+
+        assert result == "You'll get a message when any show starts 📻"
+        assert subscriptions.chats_for("Hardcore Tuesdays") == {42}
+
+    def test_subscribe_without_show(self, index):
+        command = Subscribe(Subscriptions(), index)
+
+        assert self.call(command) == command.msg
+
+    def test_unsubscribe(self, index):
+        subscriptions = Subscriptions()
+        subscriptions.add(42, "Hardcore Tuesdays")
+        command = Unsubscribe(subscriptions, index)
+
+        result = self.call(command, "Hardcore", "Tuesdays")
+        assert result == "No more messages for *Hardcore Tuesdays* 👋"
+        result = self.call(command)
+        assert result == "You weren't subscribed to any show 🤷"
+        result = self.call(command, "*Hardcore*")
+        assert result == "You weren't subscribed to *\\*Hardcore\\** 🤷"
+
+    def test_subscribe_and_unsubscribe_closest_show(self, index):
+        subscriptions = Subscriptions()
+        subscriptions.add(42, "Hardcore Tuesdays")
+
+        subscribed = self.call(Subscribe(subscriptions, index), "kraut")
+        unsubscribed = self.call(Unsubscribe(subscriptions, index), "kraut")
+
+        assert subscribed == "You'll get a message when *Kraut Kontrol* starts 📻"
+        assert unsubscribed == "No more messages for *Kraut Kontrol* 👋"
+        assert subscriptions.shows_for(42) == ["hardcore tuesdays"]
+
+    def test_unsubscribe_only_from_own_shows(self, index):
+        subscriptions = Subscriptions()
+        subscriptions.add(42, "Kraut Kontrol Revisited")
+
+        result = self.call(Unsubscribe(subscriptions, index), "hardcore")
+
+        assert result == "You weren't subscribed to *hardcore* 🤷"
+        assert subscriptions.shows_for(42) == ["kraut kontrol revisited"]
@@ -0,0 +1,125 @@
+import io
+import json
+from unittest.mock import MagicMock
+
+import pytest
+
+from commands import Week
+from tracing import NO_SPAN, JSONExporter, OTLPExporter, Tracer, exporter, tracer
+
+
+class ListExporter:
+    def __init__(self):
+        self.spans = []
+
+    def export(self, span):
+        self.spans.append(span)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def spans():
+    """Enables the global tracer, recording the spans."""
+    tracer.exporter = ListExporter()
+    yield tracer.exporter.spans
+    tracer.exporter = None
+
+
+def update(update_id=7, chat_id=42):
+    update = MagicMock(update_id=update_id)
+    update.effective_chat.id = chat_id
+    return update
+
+
+class TestTracer:
+    def test_disabled_by_default(self):
+        tracer = Tracer()
+
+        assert tracer.span("http.get", url="url") is NO_SPAN
+        assert tracer.traced("now", lambda update, context: "msg")(None, None) == "msg"
+
+    def test_spans_are_nested(self):
+        tracer = Tracer(ListExporter())
+
+        def command(update, context):
+            with tracer.span("http.get", url="url"):
+                pass
+            with tracer.span("telegram.send"):
+                pass
+
+        tracer.traced("now", command)(update(), None)
+
+        get, send, root = tracer.exporter.spans
+        assert root.name == "command"
+        assert root.attributes == {"command": "now", "update_id": 7, "chat_id": 42}
+        assert root.parent_id is None
+        assert get.parent_id == send.parent_id == root.span_id
+        assert get.trace_id == send.trace_id == root.trace_id
+        assert get.attributes == {"url": "url"}
+        assert root.end >= send.end >= send.start >= get.end >= root.start
+
+    def test_errors_are_recorded(self):
+        tracer = Tracer(ListExporter())
+
+        with pytest.raises(KeyError):
+            with tracer.span("parse"):
+                raise KeyError("currentShow")
+
+        assert tracer.exporter.spans[0].attributes == {"error": "KeyError"}
+
+    def test_exporter(self):
+        assert exporter("none") is None
+        assert isinstance(exporter("stdout"), JSONExporter)
+        with pytest.raises(ValueError):
+            exporter("zipkin")
+
+
+class TestExporters:
+    def test_json(self):
+        stream = io.StringIO()
+        tracer = Tracer(JSONExporter(stream))
+
+        with tracer.span("http.get", url="url"):
+            pass
+
+        span = json.loads(stream.getvalue())
+        assert span["name"] == "http.get"
+        assert span["attributes"] == {"url": "url"}
+        assert span["duration_ms"] >= 0
+
+    def test_otlp(self):
+        http_client = MagicMock()
+        otlp = OTLPExporter("http://collector/v1/traces", http_client=http_client)
+        tracer = Tracer(otlp)
+
+        tracer.traced("now", lambda update, context: None)(update(), None)
+        otlp.close()
+
+        url = http_client.post.call_args.args[0]
+        payload = http_client.post.call_args.kwargs["json"]
+        (span,) = payload["resourceSpans"][0]["scopeSpans"][0]["spans"]
+        assert url == "http://collector/v1/traces"
+        assert len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+        assert span["name"] == "command"
+        assert {"key": "chat_id", "value": {"intValue": "42"}} in span["attributes"]
+
+
+class TestCommandSpans:
+    def test_week(self, spans, response_week_info):
+        http_client = MagicMock()
+        http_client.get.return_value = response_week_info
+        context = MagicMock(bot_data={})
+
+        tracer.traced("week", Week(http_client))(update(), context)
+
+        assert [span.name for span in spans] == [
+            "http.get",
+            "json.loads",
+            "parse",
+            "format",
+            "telegram.send",
+            "command",
+        ]
+        assert spans[-2].attributes == {"chat_id": 42}
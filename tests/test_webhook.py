@@ -0,0 +1,138 @@
+import json
+import os
+import queue
+import signal
+import time
+from unittest.mock import MagicMock
+from urllib import error, request
+
+import pytest
+
+import keithfembot
+from store import Store
+from webhook import SECRET_TOKEN_HEADER, WebhookServer
+
+
+class FakeDispatcher:
+    def __init__(self):
+        self.bot = None
+        self.update_queue = queue.Queue()
+
+
+@pytest.fixture
+def update():
+    """A recorded /now update."""
+    return {
+        "update_id": 1,
+        "message": {
+            "message_id": 1,
+            "date": 1609099200,
+            "chat": {"id": 42, "type": "group", "title": "Keith F'em"},
+            "text": "/now",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 4}],
+        },
+    }
+
+
+@pytest.fixture
+def webhook():
+    server = WebhookServer(FakeDispatcher(), "s3cr3t", port=0, path="/telegram")
+    server.start()
+    yield server
+    server.stop()
+
+
+def post(server, body, token="s3cr3t", path="/telegram"):
+    """POSTs to the webhook and returns the status code."""
+    url = "http://%s:%s%s" % (*server.server_address, path)
+    headers = {SECRET_TOKEN_HEADER: token, "Content-Type": "application/json"}
+    try:
+        with request.urlopen(request.Request(url, body, headers)) as response:
+            return response.status
+    except error.HTTPError as exc:
+        return exc.code
+
+
+class TestWebhookServer:
+    def test_update_is_dispatched(self, webhook, update):
+        assert post(webhook, json.dumps(update).encode()) == 200
+
+        queued = webhook.dispatcher.update_queue.get(timeout=1)
+        assert queued.update_id == 1
+        assert queued.effective_chat.id == 42
+        assert queued.message.text == "/now"
+
+    def test_wrong_secret_token(self, webhook, update):
+        assert post(webhook, json.dumps(update).encode(), token="wrong") == 403
+        assert webhook.dispatcher.update_queue.empty()
+
+    def test_wrong_path(self, webhook, update):
+        assert post(webhook, json.dumps(update).encode(), path="/other") == 404
+
+    def test_invalid_update(self, webhook):
+        assert post(webhook, b"not json") == 400
+        assert webhook.dispatcher.update_queue.empty()
+
+    def test_secret_token_is_required(self):
+        with pytest.raises(ValueError):
+            WebhookServer(FakeDispatcher(), "", port=0)
+
+
+class ClosingStore(Store):
+    closed = False
+
+    def close(self):
+        super().close()
+        self.closed = True
+
+
+@pytest.fixture
+def restore_process():
+    """Restores the signal handlers and the timezone main() changes."""
+    handlers = {
+        signum: signal.getsignal(signum) for signum in (signal.SIGINT, signal.SIGTERM)
+    }
+    tz = os.environ.get("TZ")
+    yield
+    for signum, handler in handlers.items():
+        signal.signal(signum, handler)
+    if tz is None:
+        os.environ.pop("TZ", None)
+    else:
+        os.environ["TZ"] = tz
+    time.tzset()
+
+
+class TestMain:
+    def test_webhook_mode_cleans_up_on_sigterm(
+        self,
+        monkeypatch,
+        restore_process,
+        airtime,
+        response_week_info,
+        response_live_info,
+    ):
+        updater = MagicMock()
+        webhook = MagicMock()
+        stores = []
+
+        def start_webhook(updater):
+            os.kill(os.getpid(), signal.SIGTERM)
+            return webhook
+
+        def store():
+            stores.append(ClosingStore(":memory:"))
+            return stores[-1]
+
+        monkeypatch.setattr(keithfembot, "Updater", lambda **kwargs: updater)
+        monkeypatch.setattr(keithfembot, "WEBHOOK_URL", "https://bot.example.com")
+        monkeypatch.setattr(keithfembot, "METRICS", False)
+        monkeypatch.setattr(keithfembot, "Store", store)
+        monkeypatch.setattr(keithfembot, "start_webhook", start_webhook)
+
+        keithfembot.main(airtime(response_week_info, response_live_info))
+
+        updater.idle.assert_not_called()
+        webhook.stop.assert_called_once()
+        updater.dispatcher.stop.assert_called_once()
+        assert stores[0].closed